@@ -1,14 +1,35 @@
 """Screenshot analysis using OpenAI's vision model with structured outputs."""
 
+import asyncio
+import json
 import logging
+import time
+from collections.abc import Iterable
+from typing import TypeVar
+
 from openai import OpenAI
+from pydantic import BaseModel
 
-from .config import MODEL_NAME, get_openai_client
+from .config import (
+    ANALYZE_MANY_CONCURRENCY,
+    BATCH_COMPLETION_WINDOW,
+    BATCH_POLL_INTERVAL,
+    IMAGE_DETAIL,
+    MODEL_NAME,
+    PROMPT_CACHE_KEY,
+    get_async_openai_client,
+    get_openai_client,
+)
 from .logging_config import log_openai_request, log_openai_response
-from .models import StateUpdate
+from .models import BatchStateUpdate, StateUpdate
 
 logger = logging.getLogger(__name__)
 
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+# Batch states after which a batch will make no further progress
+_BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
 
 SYSTEM_PROMPT = """<role_and_objective>
 You are a visual analyzer for Clair Obscur: Expedition 33 screenshots, tracking game state in real-time.
@@ -150,48 +171,164 @@ class ScreenshotAnalyzer:
         """
         self.client = client or get_openai_client()
         self.model = MODEL_NAME
+        # Built once and shared by every request so the prompt prefix is
+        # byte-identical across calls and stays in OpenAI's prompt cache
+        self._base_messages: tuple[dict, ...] = (
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+        )
     
-    def analyze(self, image_base64: str) -> StateUpdate:
+    def analyze(
+        self,
+        image_url: str,
+        crops: list[str] | None = None,
+        context: list[str] | None = None,
+    ) -> StateUpdate:
         """Analyze a screenshot and return state update.
         
         Args:
-            image_base64: Base64-encoded PNG image
-            
+            image_url: Data URL of the screenshot
+            crops: Optional data URLs of crops of the same screenshot's
+                text regions (top-left, bottom-center), sent at low detail
+            context: Optional data URLs of earlier screenshots, oldest first, sent at low
+                detail so the model can tell appearing banners from fading ones
+        
         Returns:
             StateUpdate with detected changes or noop
         """
-        messages = [
+        return self._parse(self._build_messages(image_url, crops, context), StateUpdate)
+    
+    def analyze_many(
+        self,
+        image_urls: Iterable[str],
+        use_batch_api: bool = True,
+        concurrency: int = ANALYZE_MANY_CONCURRENCY,
+    ) -> list[StateUpdate]:
+        """Analyze a large set of screenshots when results aren't needed live.
+        
+        Intended for replays and reprocessing saved captures. By default the
+        screenshots are submitted as one OpenAI Batch API job, which is
+        cheaper and runs in parallel on OpenAI's side but can take up to the
+        batch completion window to finish. With ``use_batch_api=False`` the
+        screenshots are instead sent as concurrent async requests.
+        
+        Args:
+            image_urls: Data URLs of the screenshots, each analyzed on its own
+            use_batch_api: Submit through the Batch API instead of async requests
+            concurrency: Maximum async requests in flight (async path only)
+        
+        Returns:
+            One StateUpdate per screenshot, in the same order
+        """
+        image_urls = list(image_urls)
+        if not image_urls:
+            return []
+        if use_batch_api:
+            return self._analyze_via_batch_api(image_urls)
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        return asyncio.run(self._analyze_concurrently(image_urls, concurrency))
+    
+    def _build_messages(
+        self,
+        image_url: str,
+        crops: list[str] | None = None,
+        context: list[str] | None = None,
+    ) -> list[dict]:
+        """Build the messages for analyzing a single screenshot."""
+        content: list[dict] = [
             {
-                "role": "system",
-                "content": SYSTEM_PROMPT
-            },
+                "type": "text",
+                "text": "Analyze this Clair Obscur: Expedition 33 screenshot and determine if there's any game state to update."
+            }
+        ]
+        if context:
+            content.append(
+                {
+                    "type": "text",
+                    "text": "Report an update only if it is visible in the most recent frame (frame t); use the older frames only as context."
+                }
+            )
+            for age, frame_url in zip(range(len(context), 0, -1), context):
+                content.append({"type": "text", "text": f"Frame t-{age}:"})
+                content.append(self._image_part(frame_url, detail="low"))
+            content.append({"type": "text", "text": "Frame t:"})
+        content.append(self._image_part(image_url))
+        if crops:
+            content.append(
+                {
+                    "type": "text",
+                    "text": "Zoomed crops of the same screenshot for reading on-screen text: the top-left area-name region, then the bottom-center banner region."
+                }
+            )
+            content.extend(self._image_part(crop, detail="low") for crop in crops)
+        
+        return [*self._base_messages, {"role": "user", "content": content}]
+    
+    def analyze_batch(self, image_urls: list[str]) -> list[StateUpdate]:
+        """Analyze several screenshots in a single request.
+        
+        Sending consecutive frames together pays the per-request overhead
+        once for the whole batch instead of once per frame.
+        
+        Args:
+            image_urls: Data URLs of the screenshots, in capture order
+        
+        Returns:
+            One StateUpdate per screenshot, in the same order
+        """
+        if not image_urls:
+            return []
+        
+        content: list[dict] = [
             {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": "Analyze this Clair Obscur: Expedition 33 screenshot and determine if there's any game state to update."
-                    },
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/png;base64,{image_base64}",
-                            "detail": "high"
-                        }
-                    }
-                ]
+                "type": "text",
+                "text": (
+                    f"Analyze these {len(image_urls)} Clair Obscur: Expedition 33 screenshots, "
+                    "captured in order, and determine if there's any game state to update in each. "
+                    "Analyze every screenshot independently and return exactly one item per screenshot: "
+                    "items[i] is the analysis of screenshot i."
+                )
             }
         ]
+        for index, image_url in enumerate(image_urls):
+            content.append({"type": "text", "text": f"Screenshot {index}:"})
+            content.append(self._image_part(image_url))
+        
+        messages = [*self._base_messages, {"role": "user", "content": content}]
         
+        batch = self._parse(messages, BatchStateUpdate)
+        if len(batch.items) != len(image_urls):
+            raise ValueError(
+                f"Expected {len(image_urls)} updates from batch analysis, got {len(batch.items)}"
+            )
+        return batch.items
+    
+    @staticmethod
+    def _image_part(image_url: str, detail: str = IMAGE_DETAIL) -> dict:
+        """Build the message content block for a single screenshot."""
+        return {
+            "type": "image_url",
+            "image_url": {
+                "url": image_url,
+                "detail": detail
+            }
+        }
+    
+    def _parse(self, messages: list[dict], response_format: type[ResponseT]) -> ResponseT:
+        """Send a structured-output request and return the parsed result."""
         # Log the request
-        log_openai_request(logger, self.model, messages, StateUpdate)
+        log_openai_request(logger, self.model, messages, response_format)
         
         logger.debug(f"Sending request to OpenAI model: {self.model}")
         
         response = self.client.beta.chat.completions.parse(
             model=self.model,
             messages=messages,
-            response_format=StateUpdate,
+            response_format=response_format,
+            prompt_cache_key=PROMPT_CACHE_KEY,
         )
         
         parsed_result = response.choices[0].message.parsed
@@ -200,3 +337,94 @@ class ScreenshotAnalyzer:
         log_openai_response(logger, response, parsed_result)
         
         return parsed_result
+    
+    def _analyze_via_batch_api(self, image_urls: list[str]) -> list[StateUpdate]:
+        """Submit screenshots as a Batch API job and wait for the results."""
+        # The Batch API takes raw request bodies, so the structured output
+        # schema is passed explicitly and results are validated locally
+        response_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": StateUpdate.__name__,
+                "schema": StateUpdate.model_json_schema(),
+                "strict": False,
+            },
+        }
+        lines = []
+        for index, image_url in enumerate(image_urls):
+            request = {
+                "custom_id": str(index),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": self._build_messages(image_url),
+                    "response_format": response_format,
+                    "prompt_cache_key": PROMPT_CACHE_KEY,
+                },
+            }
+            lines.append(json.dumps(request))
+        payload = ("\n".join(lines) + "\n").encode("utf-8")
+        
+        input_file = self.client.files.create(
+            file=("analysis_batch.jsonl", payload), purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+        logger.info(f"Submitted batch {batch.id} with {len(image_urls)} screenshots")
+        
+        while batch.status not in _BATCH_TERMINAL_STATUSES:
+            time.sleep(BATCH_POLL_INTERVAL)
+            batch = self.client.batches.retrieve(batch.id)
+            logger.debug(f"Batch {batch.id} status: {batch.status}")
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch.id} ended with status {batch.status}")
+        
+        updates: dict[int, StateUpdate] = {}
+        errors: dict[int, str] = {}
+        output = self.client.files.content(batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            index = int(result["custom_id"])
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                errors[index] = str(result.get("error") or response.get("body"))
+                continue
+            message = response["body"]["choices"][0]["message"]["content"]
+            updates[index] = StateUpdate.model_validate_json(message)
+        
+        missing = [i for i in range(len(image_urls)) if i not in updates]
+        if missing:
+            first = missing[0]
+            raise RuntimeError(
+                f"Batch {batch.id} returned no result for {len(missing)} screenshots "
+                f"(first: {first}, error: {errors.get(first, 'missing from output')})"
+            )
+        logger.info(f"Batch {batch.id} completed: {len(updates)} screenshots analyzed")
+        return [updates[i] for i in range(len(image_urls))]
+    
+    async def _analyze_concurrently(self, image_urls: list[str], concurrency: int) -> list[StateUpdate]:
+        """Analyze screenshots as concurrent async requests, bounded by a semaphore."""
+        client = get_async_openai_client()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def analyze_one(image_url: str) -> StateUpdate:
+            async with semaphore:
+                response = await client.beta.chat.completions.parse(
+                    model=self.model,
+                    messages=self._build_messages(image_url),
+                    response_format=StateUpdate,
+                    prompt_cache_key=PROMPT_CACHE_KEY,
+                )
+            parsed_result = response.choices[0].message.parsed
+            log_openai_response(logger, response, parsed_result)
+            return parsed_result
+        
+        async with client:
+            return list(await asyncio.gather(*(analyze_one(url) for url in image_urls)))
@@ -2,20 +2,90 @@
 
 import base64
 import io
+import logging
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+import numpy as np
 from mss import mss
 from mss.base import MSSBase
+from PIL import Image
+
+try:
+    # SIMD-accelerated drop-in for the stdlib encoder, used when installed
+    import pybase64 as _b64
+except ImportError:
+    _b64 = base64
+
+from .config import (
+    CAPTURE_INTERVAL,
+    CAPTURE_QUEUE_SIZE,
+    CROP_MAX_SIDE,
+    IMAGE_FORMAT,
+    IMAGE_MAX_SIDE,
+    IMAGE_MIME_TYPE,
+    IMAGE_QUALITY,
+    ROI_CROPS_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+_DATA_URL_PREFIX = f"data:{IMAGE_MIME_TYPE};base64,".encode("ascii")
+
+
+@dataclass
+class CapturedFrame:
+    """A captured screenshot, encoded and ready to send to the vision model.
+    
+    Images are stored as complete data URLs so they can be placed in a
+    request as-is.
+    
+    Attributes:
+        image: WebP data URL of the downscaled full frame
+        crops: WebP data URLs of the text regions (top-left, bottom-center)
+        phash: 64-bit average hash of the frame, for cheap duplicate detection
+        context: Data URLs of earlier captures (oldest first) sent as temporal context
+        captured_at: Wall-clock time the grab started
+        capture_time: Seconds spent grabbing and encoding the frame
+        text_edge_variance: Highest Laplacian variance across the text regions;
+            low values mean no on-screen text
+        center_saturation: Mean saturation (0-255) of the screen center
+        center_brightness: Mean brightness (0-255) of the screen center
+    """
+    image: str
+    crops: list[str] = field(default_factory=list)
+    phash: int = 0
+    context: list[str] = field(default_factory=list)
+    captured_at: float = 0.0
+    capture_time: float = 0.0
+    text_edge_variance: float = 0.0
+    center_saturation: float = 0.0
+    center_brightness: float = 0.0
 
 
 class ScreenCapture:
     """Handles screen capture and encoding for LLM input."""
     
-    def __init__(self, monitor: int = 1):
+    def __init__(
+        self,
+        monitor: int = 1,
+        quality: int = IMAGE_QUALITY,
+        max_side: int = IMAGE_MAX_SIDE,
+        roi_crops: bool = ROI_CROPS_ENABLED,
+    ):
         """Initialize screen capture.
         
         Args:
             monitor: Monitor number to capture (1 = primary monitor)
+            quality: Lossy encoding quality (1-100)
+            max_side: Longest side in pixels the full frame is downscaled to
+            roi_crops: Whether capture_frame also returns crops of the text regions
         """
         self.monitor = monitor
+        self.quality = quality
+        self.max_side = max_side
+        self.roi_crops = roi_crops
         self._sct: MSSBase | None = None
     
     def __enter__(self) -> "ScreenCapture":
@@ -28,27 +98,214 @@ class ScreenCapture:
             self._sct = None
     
     def capture_base64(self) -> str:
-        """Capture screenshot and return as base64-encoded PNG.
+        """Capture screenshot and return as base64-encoded WebP.
+        
+        Returns:
+            Base64-encoded WebP image string suitable for OpenAI API
+        """
+        img = self._grab()
+        return self._encode(self._downscale(img, self.max_side)).decode("ascii")
+    
+    def capture_frame(self) -> CapturedFrame:
+        """Capture screenshot along with crops of the regions that carry text.
+        
+        Crops are cut from the full-resolution grab before downscaling, so area
+        names and banners stay legible even when the full frame is small.
         
         Returns:
-            Base64-encoded PNG image string suitable for OpenAI API
+            CapturedFrame with the downscaled frame, its perceptual hash and,
+            if enabled, ROI crops
         """
+        captured_at = time.time()
+        img = self._grab()
+        crops = []
+        if self.roi_crops:
+            crops = [
+                self._data_url(self._downscale(img.crop(box), CROP_MAX_SIDE))
+                for box in self._roi_boxes(img.width, img.height)
+            ]
+        small = self._downscale(img, self.max_side)
+        text_edge_variance, center_saturation, center_brightness = self._content_stats(small)
+        return CapturedFrame(
+            image=self._data_url(small),
+            crops=crops,
+            phash=self._average_hash(small),
+            captured_at=captured_at,
+            capture_time=time.time() - captured_at,
+            text_edge_variance=text_edge_variance,
+            center_saturation=center_saturation,
+            center_brightness=center_brightness,
+        )
+    
+    def _grab(self) -> Image.Image:
+        """Grab the configured monitor as a full-resolution RGB image."""
         if self._sct is None:
             raise RuntimeError("ScreenCapture must be used as context manager")
         
         # Capture the specified monitor
         screenshot = self._sct.grab(self._sct.monitors[self.monitor])
+        # Decode the native BGRA buffer directly instead of going through
+        # screenshot.rgb, which builds a full RGB copy of the frame first
+        return Image.frombuffer("RGB", screenshot.size, screenshot.raw, "raw", "BGRX", 0, 1)
+    
+    @staticmethod
+    def _roi_boxes(width: int, height: int) -> list[tuple[int, int, int, int]]:
+        """Crop boxes for the area-name strip (top-left) and banner strip (bottom-center)."""
+        return [
+            (0, 0, width // 3, height // 4),
+            (width // 4, height * 3 // 4, width * 3 // 4, height),
+        ]
+    
+    @classmethod
+    def _content_stats(cls, img: Image.Image) -> tuple[float, float, float]:
+        """Cheap signals for whether a frame is worth sending to the model.
+        
+        Returns:
+            (text_edge_variance, center_saturation, center_brightness)
+        """
+        gray = np.asarray(img.convert("L"), dtype=np.float32)
+        text_edge_variance = 0.0
+        for left, top, right, bottom in cls._roi_boxes(img.width, img.height):
+            band = gray[top:bottom, left:right]
+            # 4-neighbour Laplacian; text strokes give sharp second derivatives
+            laplacian = (
+                4 * band[1:-1, 1:-1]
+                - band[:-2, 1:-1] - band[2:, 1:-1]
+                - band[1:-1, :-2] - band[1:-1, 2:]
+            )
+            text_edge_variance = max(text_edge_variance, float(laplacian.var()))
+        
+        width, height = img.size
+        center = img.crop((width // 4, height // 4, width * 3 // 4, height * 3 // 4))
+        hsv = np.asarray(center.convert("HSV"), dtype=np.float32)
+        return text_edge_variance, float(hsv[..., 1].mean()), float(hsv[..., 2].mean())
+    
+    @staticmethod
+    def _average_hash(img: Image.Image) -> int:
+        """Compute a 64-bit average hash: one bit per 8x8 cell brighter than the mean."""
+        pixels = np.asarray(img.resize((8, 8), Image.Resampling.BOX).convert("L"), dtype=np.float32)
+        bits = (pixels > pixels.mean()).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+    
+    @staticmethod
+    def _downscale(img: Image.Image, max_side: int) -> Image.Image:
+        """Shrink an image so its longest side is at most max_side pixels."""
+        scale = max_side / max(img.size)
+        if scale >= 1:
+            return img
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+    
+    def _encode(self, img: Image.Image) -> bytes:
+        """Encode an image as base64 WebP."""
+        return _b64.b64encode(self._to_webp(img))
+    
+    def _data_url(self, img: Image.Image) -> str:
+        """Encode an image as a WebP data URL, decoding to str exactly once."""
+        return (_DATA_URL_PREFIX + self._encode(img)).decode("ascii")
+    
+    def _to_webp(self, img: Image.Image) -> bytes:
+        """Convert an image to lossy WebP bytes.
+        
+        WebP is several times smaller than PNG for game frames and cheaper
+        to encode than DEFLATE on a full-resolution RGB buffer.
+        """
+        buffer = io.BytesIO()
+        img.save(buffer, format=IMAGE_FORMAT, quality=self.quality, method=4)
+        return buffer.getvalue()
+
+
+class AsyncCapture:
+    """Captures and encodes frames on a background thread at a fixed cadence.
+    
+    Grabbing, downscaling and encoding run on a dedicated thread so they
+    overlap with analysis dispatch on the caller's thread. Frames are handed
+    over through a small bounded queue; if the consumer falls behind, the
+    oldest queued frame is dropped so the newest screen is never lost.
+    """
+    
+    def __init__(
+        self,
+        interval: float = CAPTURE_INTERVAL,
+        queue_size: int = CAPTURE_QUEUE_SIZE,
+        **capture_kwargs,
+    ):
+        """Initialize background capture.
+        
+        Args:
+            interval: Seconds between captures
+            queue_size: Maximum number of frames waiting to be consumed
+            **capture_kwargs: Passed through to ScreenCapture
+        """
+        if queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.interval = interval
+        self._capture_kwargs = capture_kwargs
+        self._frames: queue.Queue[CapturedFrame] = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+    
+    def __enter__(self) -> "AsyncCapture":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capture", daemon=True)
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *args) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def get_frame(self, timeout: float | None = None) -> CapturedFrame | None:
+        """Wait for the next captured frame.
         
-        # Convert to PNG bytes
-        png_bytes = self._to_png(screenshot)
+        Args:
+            timeout: Maximum seconds to wait (None = wait indefinitely)
         
-        # Encode to base64
-        return base64.b64encode(png_bytes).decode("utf-8")
+        Returns:
+            The oldest frame not yet consumed, or None if none arrived in time
+        """
+        try:
+            return self._frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    
+    def _run(self) -> None:
+        """Capture loop run on the background thread."""
+        # mss handles are thread-bound, so the ScreenCapture is opened here
+        with ScreenCapture(**self._capture_kwargs) as capture:
+            next_deadline = time.monotonic()
+            while not self._stop.is_set():
+                try:
+                    self._put(capture.capture_frame())
+                except Exception as e:
+                    logger.error(f"Error capturing frame: {e}", exc_info=True)
+                
+                # Wait until the next capture deadline so the cadence doesn't
+                # drift by however long the capture took
+                next_deadline += self.interval
+                sleep_for = next_deadline - time.monotonic()
+                if sleep_for > 0:
+                    self._stop.wait(sleep_for)
+                else:
+                    # Running late: capture immediately and resync rather
+                    # than firing a burst of frames to catch up
+                    logger.debug(f"Capture ran {-sleep_for:.3f}s past its deadline, resyncing")
+                    next_deadline = time.monotonic()
     
-    def _to_png(self, screenshot) -> bytes:
-        """Convert mss screenshot to PNG bytes."""
-        from mss.tools import to_png
-        return to_png(screenshot.rgb, screenshot.size)
+    def _put(self, frame: CapturedFrame) -> None:
+        """Queue a frame, dropping the oldest one if the queue is full."""
+        while True:
+            try:
+                self._frames.put_nowait(frame)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    logger.debug("Capture queue full, dropped oldest frame")
+                except queue.Empty:
+                    pass
 
 
 def capture_screen_base64(monitor: int = 1) -> str:
@@ -56,10 +313,9 @@ def capture_screen_base64(monitor: int = 1) -> str:
     
     Args:
         monitor: Monitor number to capture (1 = primary)
-        
+    
     Returns:
-        Base64-encoded PNG image string
+        Base64-encoded WebP image string
     """
     with ScreenCapture(monitor=monitor) as capture:
         return capture.capture_base64()
-
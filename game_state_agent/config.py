@@ -2,7 +2,7 @@
 
 import os
 from dotenv import find_dotenv, load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 # Load environment variables from root .env file
 load_dotenv(find_dotenv())
@@ -10,10 +10,60 @@ load_dotenv(find_dotenv())
 # OpenAI configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 MODEL_NAME = "gpt-5.1-2025-11-13"
+# Routes analyzer requests to the same prompt-cache shard so the shared
+# system prompt prefix keeps hitting the cache
+PROMPT_CACHE_KEY = "game-state-analyzer"
 
 # Screenshot interval in seconds
 CAPTURE_INTERVAL = 2
 
+# Captured frames buffered between the capture thread and the analysis loop
+CAPTURE_QUEUE_SIZE = 2
+
+# Maximum number of analysis requests allowed in flight at once
+MAX_IN_FLIGHT = 3
+
+# Screenshots sent per analysis request (1 = analyze each frame on its own)
+ANALYSIS_BATCH_SIZE = 1
+
+# Screenshot encoding sent to the vision model
+IMAGE_FORMAT = "WEBP"
+IMAGE_MIME_TYPE = "image/webp"
+IMAGE_QUALITY = 85
+
+# Longest side (px) of the full frame; 1024 keeps a 16:9 frame within 4 high-detail tiles
+IMAGE_MAX_SIDE = 1024
+IMAGE_DETAIL = "high"
+
+# Low-detail crops of the area-name and banner regions sent alongside each frame
+ROI_CROPS_ENABLED = True
+CROP_MAX_SIDE = 512
+
+# Frames per single-frame analysis: the current one plus up to K-1 earlier
+# captures sent at low detail as temporal context (1 = current frame only)
+CONTEXT_FRAMES = 3
+
+# Frames whose 64-bit perceptual hash differs from the last analyzed frame by
+# fewer than this many bits are skipped as duplicates
+DEDUPE_HAMMING_THRESHOLD = 5
+# Analyze at least every Nth frame even if it looks unchanged or is
+# prefiltered (0 = never force)
+DEDUPE_FORCE_EVERY = 10
+
+# Local prefilter: frames with no text-like edges in the area-name/banner
+# regions and no dark, desaturated menu background are skipped as noop
+PREFILTER_ENABLED = True
+PREFILTER_EDGE_VARIANCE = 150.0
+PREFILTER_MENU_SATURATION = 40.0
+PREFILTER_MENU_BRIGHTNESS = 60.0
+
+# Offline analysis (ScreenshotAnalyzer.analyze_many)
+BATCH_COMPLETION_WINDOW = "24h"
+# Seconds between Batch API status checks
+BATCH_POLL_INTERVAL = 30
+# Concurrent requests when bypassing the Batch API
+ANALYZE_MANY_CONCURRENCY = 8
+
 # Redis configuration (loaded from .env via existing load_dotenv call)
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -26,3 +76,10 @@ def get_openai_client() -> OpenAI:
     if not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY environment variable not set")
     return OpenAI(api_key=OPENAI_API_KEY)
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get configured async OpenAI client."""
+    if not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable not set")
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
@@ -69,6 +69,9 @@ def log_openai_request(logger: logging.Logger, model: str, messages: list, respo
         messages: Messages being sent to the API
         response_format: The response format type if using structured outputs
     """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    
     # Extract just the essential info from messages
     message_summary = []
     for msg in messages:
@@ -102,11 +105,17 @@ def log_openai_response(logger: logging.Logger, response: object, parsed_result:
         response: Raw response from OpenAI
         parsed_result: Parsed structured output if applicable
     """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    
     # Log usage stats
     usage = getattr(response, "usage", None)
     if usage:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
         logger.debug(
-            f"OpenAI Response -> tokens: {usage.prompt_tokens} prompt + "
+            f"OpenAI Response -> tokens: {usage.prompt_tokens} prompt "
+            f"({cached_tokens} cached) + "
             f"{usage.completion_tokens} completion = {usage.total_tokens} total"
         )
     
@@ -124,6 +133,9 @@ def log_game_state(logger: logging.Logger, state: object, update: object | None
         state: Current GameState object
         update: The StateUpdate that was applied (if any)
     """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     if hasattr(state, "model_dump"):
         state_dict = state.model_dump()
     else:
@@ -3,30 +3,97 @@
 import logging
 import signal
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import NamedTuple
 
 from .analyzer import ScreenshotAnalyzer
-from .capture import ScreenCapture
-from .config import CAPTURE_INTERVAL
+from .capture import AsyncCapture, CapturedFrame
+from .config import (
+    ANALYSIS_BATCH_SIZE,
+    CAPTURE_INTERVAL,
+    CONTEXT_FRAMES,
+    DEDUPE_FORCE_EVERY,
+    DEDUPE_HAMMING_THRESHOLD,
+    MAX_IN_FLIGHT,
+    PREFILTER_EDGE_VARIANCE,
+    PREFILTER_ENABLED,
+    PREFILTER_MENU_BRIGHTNESS,
+    PREFILTER_MENU_SATURATION,
+)
 from .logging_config import setup_logging
+from .models import StateUpdate, UpdateType
 from .redis_store import GameStateStore
 from .state_manager import StateManager
 
 logger = logging.getLogger(__name__)
 
 
+class _PendingAnalysis(NamedTuple):
+    """Captured frames whose analysis request is still in flight."""
+    seqs: list[int]
+    started_at: float
+    capture_time: float
+    future: Future[tuple[list[StateUpdate], float]]
+
+
 class GameStateAgent:
     """Main agent that coordinates screenshot capture and analysis."""
-
-    def __init__(self, capture_interval: float = CAPTURE_INTERVAL):
+    
+    def __init__(
+        self,
+        capture_interval: float = CAPTURE_INTERVAL,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        batch_size: int = ANALYSIS_BATCH_SIZE,
+        dedupe_threshold: int = DEDUPE_HAMMING_THRESHOLD,
+        dedupe_force_every: int = DEDUPE_FORCE_EVERY,
+        context_frames: int = CONTEXT_FRAMES,
+        prefilter: bool = PREFILTER_ENABLED,
+    ):
         """Initialize the game state agent.
-
+        
         Args:
             capture_interval: Seconds between screenshot captures
+            max_in_flight: Maximum number of analysis requests outstanding at once
+            batch_size: Screenshots sent together in one analysis request
+            dedupe_threshold: Frames whose perceptual hash differs from the last
+                analyzed frame by fewer bits than this are skipped (0 = disabled)
+            dedupe_force_every: Analyze every Nth frame regardless of dedupe
+                (0 = never force)
+            context_frames: Frames sent per single-frame analysis, counting the
+                current one; earlier captures go along as low-detail context
+            prefilter: Skip frames that local image statistics show carry no
+                text or menu, without calling the model
         """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if context_frames < 1:
+            raise ValueError("context_frames must be at least 1")
         self.capture_interval = capture_interval
+        self.max_in_flight = max_in_flight
+        self.batch_size = batch_size
+        self.dedupe_threshold = dedupe_threshold
+        self.dedupe_force_every = dedupe_force_every
+        self.prefilter = prefilter
         self.redis_store = GameStateStore()
         self.state_manager = StateManager(redis_store=self.redis_store)
         self.analyzer = ScreenshotAnalyzer()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_in_flight, thread_name_prefix="analyzer"
+        )
+        self._inflight: deque[_PendingAnalysis] = deque()
+        self._batch: list[CapturedFrame] = []
+        self._batch_seqs: list[int] = []
+        self._batch_started_at = 0.0
+        self._batch_capture_time = 0.0
+        self._frame_seq = 0
+        self._last_phash: int | None = None
+        self._frames_since_analysis = 0
+        self._deduped_frames = 0
+        self._prefiltered_frames = 0
+        self._recent_images: deque[str] = deque(maxlen=context_frames - 1)
         self._running = False
     
     def start(self) -> None:
@@ -35,23 +102,46 @@ class GameStateAgent:
         logger.info("=" * 50)
         logger.info("Game State Agent Started")
         logger.info(f"Capture interval: {self.capture_interval}s")
+        logger.info(f"Max in-flight requests: {self.max_in_flight}")
+        logger.info(f"Analysis batch size: {self.batch_size}")
+        logger.info(f"Context frames per analysis: {self._recent_images.maxlen + 1}")
+        logger.info(
+            f"Dedupe threshold: {self.dedupe_threshold} bits "
+            f"(forced every {self.dedupe_force_every} frames)"
+        )
         logger.info("=" * 50)
         
         # Set up signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
-        with ScreenCapture() as capture:
+        # Frames are captured and encoded on a background thread at the
+        # configured cadence; this loop only dispatches and applies analyses
+        with AsyncCapture(interval=self.capture_interval) as capture:
+            # Frames arrive about one interval apart, so until the next is
+            # due, wait on in-flight analyses instead of the frame queue
+            next_frame_due = time.monotonic()
             while self._running:
                 try:
-                    self._process_frame(capture)
+                    self._apply_until(next_frame_due)
+                    frame = capture.get_frame(timeout=self.capture_interval)
+                    next_frame_due = time.monotonic() + self.capture_interval
+                    if frame is not None:
+                        self._process_frame(frame)
                 except Exception as e:
                     logger.error(f"Error processing frame: {e}", exc_info=True)
-                
-                # Wait for next capture interval
-                if self._running:
-                    time.sleep(self.capture_interval)
         
+        # Analyze any partial batch and apply whatever is still in flight
+        # so the final state is persisted
+        self._submit_batch()
+        while self._inflight:
+            self._apply_oldest()
+        self._pool.shutdown(wait=True)
+        
+        logger.info(
+            f"Skipped {self._deduped_frames} duplicate and {self._prefiltered_frames} "
+            f"prefiltered frames of {self._frame_seq} captured"
+        )
         logger.info("Game State Agent stopped")
     
     def stop(self) -> None:
@@ -63,33 +153,172 @@ class GameStateAgent:
         logger.info("\nShutdown signal received...")
         self.stop()
     
-    def _process_frame(self, capture: ScreenCapture) -> None:
-        """Capture and analyze a single frame."""
-        start_time = time.time()
+    def _process_frame(self, frame: CapturedFrame) -> None:
+        """Queue a captured frame for analysis.
+        
+        Completed analyses are applied first, in capture order. Frames are
+        accumulated until ``batch_size`` are available and then submitted as a
+        single request. When ``max_in_flight`` requests are already
+        outstanding, this blocks on the oldest one before submitting another.
+        Frames that look unchanged since the last analyzed frame, or that the
+        local prefilter shows carry no text or menu, are dropped without an
+        API call, since they would only come back as noop.
+        """
+        self._apply_completed()
+        
+        self._frame_seq += 1
+        logger.debug(f"Frame {self._frame_seq} captured in {frame.capture_time:.3f}s")
+        frame.context = list(self._recent_images)
+        self._recent_images.append(frame.image)
+        skip_reason = self._skip_reason(frame)
+        if skip_reason == "duplicate":
+            self._deduped_frames += 1
+            logger.debug(f"Frame {self._frame_seq} deduped")
+            return
+        if skip_reason == "prefilter":
+            self._prefiltered_frames += 1
+            logger.debug(
+                f"Frame {self._frame_seq} skipped by local prefilter "
+                f"(edge variance {frame.text_edge_variance:.0f}, "
+                f"center saturation {frame.center_saturation:.0f}, "
+                f"brightness {frame.center_brightness:.0f})"
+            )
+            self.state_manager.process_update(
+                StateUpdate(update_type=UpdateType.NOOP, reasoning="local prefilter")
+            )
+            return
+        
+        if not self._batch:
+            self._batch_started_at = frame.captured_at
+            self._batch_capture_time = 0.0
+        self._batch.append(frame)
+        self._batch_seqs.append(self._frame_seq)
+        self._batch_capture_time += frame.capture_time
+        
+        if len(self._batch) >= self.batch_size:
+            self._submit_batch()
+    
+    def _skip_reason(self, frame: CapturedFrame) -> str | None:
+        """Decide whether a frame can skip analysis, recording it if it won't.
         
-        # Capture screenshot
-        logger.debug("Capturing screenshot...")
-        image_base64 = capture.capture_base64()
-        capture_time = time.time() - start_time
-        logger.debug(f"Screenshot captured in {capture_time:.3f}s")
+        Comparing against the last analyzed frame rather than the previous
+        capture keeps a slow drift from being skipped indefinitely. Every
+        ``dedupe_force_every``-th frame is analyzed regardless, as a safety
+        valve for both checks.
         
-        # Analyze with LLM
-        logger.debug("Analyzing screenshot with LLM...")
+        Returns:
+            "duplicate" or "prefilter" if the frame should be skipped, else None
+        """
+        self._frames_since_analysis += 1
+        forced = 0 < self.dedupe_force_every <= self._frames_since_analysis
+        if not forced:
+            if self._last_phash is not None:
+                distance = (frame.phash ^ self._last_phash).bit_count()
+                if distance < self.dedupe_threshold:
+                    return "duplicate"
+            if self.prefilter and self._looks_uninformative(frame):
+                return "prefilter"
+        self._last_phash = frame.phash
+        self._frames_since_analysis = 0
+        return None
+    
+    @staticmethod
+    def _looks_uninformative(frame: CapturedFrame) -> bool:
+        """Whether a frame shows neither on-screen text nor a menu background."""
+        has_text = frame.text_edge_variance >= PREFILTER_EDGE_VARIANCE
+        looks_like_menu = (
+            frame.center_saturation < PREFILTER_MENU_SATURATION
+            and frame.center_brightness < PREFILTER_MENU_BRIGHTNESS
+        )
+        return not has_text and not looks_like_menu
+    
+    def _submit_batch(self) -> None:
+        """Submit the accumulated frames for analysis in the background."""
+        if not self._batch:
+            return
+        if len(self._inflight) >= self.max_in_flight:
+            self._apply_oldest()
+        
+        future = self._pool.submit(self._analyze, self._batch)
+        self._inflight.append(
+            _PendingAnalysis(
+                self._batch_seqs, self._batch_started_at, self._batch_capture_time, future
+            )
+        )
+        logger.debug(
+            f"{self._describe(self._batch_seqs)} submitted for analysis "
+            f"({len(self._inflight)} in flight)"
+        )
+        self._batch = []
+        self._batch_seqs = []
+    
+    def _analyze(self, frames: list[CapturedFrame]) -> tuple[list[StateUpdate], float]:
+        """Analyze frames on a worker thread, returning the updates and the duration.
+        
+        ROI crops and context frames are only sent for single-frame requests;
+        batched requests send the full frames alone to keep the payload bounded.
+        """
         analysis_start = time.time()
-        update = self.analyzer.analyze(image_base64)
-        analysis_time = time.time() - analysis_start
-        logger.debug(f"Analysis completed in {analysis_time:.3f}s")
+        if len(frames) == 1:
+            frame = frames[0]
+            updates = [self.analyzer.analyze(frame.image, frame.crops, frame.context)]
+        else:
+            updates = self.analyzer.analyze_batch([frame.image for frame in frames])
+        return updates, time.time() - analysis_start
+    
+    def _apply_until(self, deadline: float) -> None:
+        """Apply analyses as they finish, in capture order, until the monotonic deadline.
+        
+        Called while the next frame is being captured, so a finished analysis
+        is applied right away instead of after the frame arrives.
+        """
+        while self._running and self._inflight:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            # Only the oldest analysis can be applied next
+            done, _ = wait(
+                [self._inflight[0].future], timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            if not done:
+                return
+            self._apply_completed()
+    
+    def _apply_completed(self) -> None:
+        """Apply finished analyses without blocking, stopping at the first pending one."""
+        while self._inflight and self._inflight[0].future.done():
+            self._apply_oldest()
+    
+    def _apply_oldest(self) -> None:
+        """Wait for the oldest in-flight analysis and apply its updates."""
+        pending = self._inflight.popleft()
+        frames = self._describe(pending.seqs)
+        try:
+            updates, analysis_time = pending.future.result()
+        except Exception as e:
+            logger.error(f"Error analyzing {frames}: {e}", exc_info=True)
+            return
+        logger.debug(f"Analysis of {frames} completed in {analysis_time:.3f}s")
         
-        # Process update
-        changed = self.state_manager.process_update(update)
+        # Process updates in capture order
+        changed = False
+        for update in updates:
+            changed = self.state_manager.process_update(update) or changed
         
         # Log timing and state
-        total_time = time.time() - start_time
+        total_time = time.time() - pending.started_at
         logger.info(
-            f"Frame processed in {total_time:.2f}s "
-            f"(capture: {capture_time:.2f}s, analysis: {analysis_time:.2f}s) "
+            f"{frames} processed in {total_time:.2f}s "
+            f"(capture: {pending.capture_time:.2f}s, analysis: {analysis_time:.2f}s) "
             f"- {'STATE CHANGED' if changed else 'no change'}"
         )
+    
+    @staticmethod
+    def _describe(seqs: list[int]) -> str:
+        """Describe a run of frame numbers for log messages."""
+        if len(seqs) == 1:
+            return f"Frame {seqs[0]}"
+        return f"Frames {seqs[0]}-{seqs[-1]}"
 
 
 def main():
@@ -138,6 +138,16 @@ class StateUpdate(BaseModel):
     )
 
 
+class BatchStateUpdate(BaseModel):
+    """Structured output for several screenshots analyzed in a single request.
+    
+    Items are returned in the same order the screenshots were sent.
+    """
+    items: list[StateUpdate] = Field(
+        description="One state update per screenshot, in the order the screenshots were provided. items[i] is the analysis of screenshot i."
+    )
+
+
 class GameState(BaseModel):
     """Current state of the game being tracked."""
     player_location: str = Field(
@@ -77,8 +77,6 @@ class StateManager:
         """
         if update.update_type == UpdateType.NOOP:
             logger.debug(f"Noop update: {update.reasoning}")
-            # Still log the state even for noop (every update cycle)
-            log_game_state(logger, self.state, update)
             return False
         
         changed = self.state.apply_update(update)
@@ -99,9 +97,10 @@ class StateManager:
                     listener(self.state, update)
                 except Exception as e:
                     logger.error(f"Listener error: {e}")
-        
-        # Log game state after every update attempt
-        log_game_state(logger, self.state, update)
+            
+            # Only dump the full state when it changed; unchanged updates
+            # would just reprint the same state every capture cycle
+            log_game_state(logger, self.state, update)
         
         return changed
     
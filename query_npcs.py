@@ -2,13 +2,19 @@
 Query Clair Obscur: Expedition 33 data from Redis Vector Database
 """
 
+import base64
+import functools
+import hashlib
+import json
 import os
 
 import numpy as np
 import redis
 from dotenv import load_dotenv
 from openai import OpenAI
+from redis.commands.search.document import Document
 from redis.commands.search.query import Query
+from redis.commands.search.result import Result
 
 # --- Configuration ---
 load_dotenv()
@@ -18,51 +24,233 @@ REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 INDEX_NAME = "idx:npcs"
 VECTOR_DIM = 1536  # OpenAI text-embedding-3-small output dimension
 EMBEDDING_MODEL = "text-embedding-3-small"
+RERANK_CANDIDATE_FACTOR = 10  # Candidates fetched per requested result when reranking
+QUERY_EMBEDDING_TTL = 86400  # Seconds query embeddings stay cached in Redis
+QUERY_RESULT_TTL = 300  # Seconds semantic search results stay cached in Redis
+QUERY_RESULT_PREFIX = "qres:"  # Cleared by redis_setup/setup_redis.py on every rebuild
+
+# Hash fields returned by get_entry (excludes binary embedding field)
+ENTRY_FIELDS = [
+    "id",
+    "name",
+    "race",
+    "role",
+    "locations",
+    "region",
+    "affiliation",
+    "quest",
+    "is_hostile",
+    "becomes_hostile",
+    "drops",
+    "description",
+    "lore",
+    "dialogue",
+    "weakness",
+    "resistance",
+    "how_to_beat_tips",
+]
 
 # --- Connect ---
-redis_client = redis.Redis(
-    host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, decode_responses=True
+# Responses are left as bytes and decoded per field where needed; search
+# results are decoded by redis-py's search Result either way
+redis_pool = redis.ConnectionPool(
+    host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, max_connections=32
 )
-openai_client = OpenAI()
+redis_client = redis.Redis(connection_pool=redis_pool)
 
 
-def get_embedding(text: str) -> list[float]:
-    """Get embedding for a single text using OpenAI API."""
-    response = openai_client.embeddings.create(
+@functools.lru_cache(maxsize=1)
+def get_openai_client():
+    """Create the OpenAI client on first use, so importing this module stays cheap."""
+    return OpenAI()
+
+
+def _query_hash(text: str) -> str:
+    """Stable short hash of a query string, used in cache keys."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@functools.lru_cache(maxsize=4096)
+def get_embedding(text: str) -> np.ndarray:
+    """Get embedding for a single text using OpenAI API.
+
+    Results are cached in process and in Redis for QUERY_EMBEDDING_TTL
+    seconds, so repeated queries skip the API call, across runs too.
+    The returned float32 array is shared with the cache and is read-only.
+    """
+    key = f"qemb:{_query_hash(text)}"
+    cached = redis_client.get(key)
+    if cached:
+        return np.frombuffer(cached, dtype=np.float32)
+
+    response = get_openai_client().embeddings.create(
         model=EMBEDDING_MODEL,
         input=text,
+        encoding_format="base64",
     )
-    return response.data[0].embedding
+    raw = _decode_embedding(response.data[0].embedding)
+    redis_client.set(key, raw, ex=QUERY_EMBEDDING_TTL)
+    return np.frombuffer(raw, dtype=np.float32)
 
 
-def semantic_search(query_text, top_k=3, filter_expr="*"):
-    """
-    Search by semantic similarity.
+def get_embeddings(texts: list[str]) -> np.ndarray:
+    """Get embeddings for several texts in a single OpenAI API request.
 
-    Args:
-        query_text: Natural language query
-        top_k: Number of results to return
-        filter_expr: Optional filter (e.g., "@region:{The Continent}")
+    Embeddings already cached in Redis are reused; only the rest are sent.
 
     Returns:
-        List of matching entries with scores
+        float32 array of shape (len(texts), VECTOR_DIM), one row per text
+    """
+    keys = [f"qemb:{_query_hash(text)}" for text in texts]
+    embeddings = np.empty((len(texts), VECTOR_DIM), dtype=np.float32)
+    misses = []
+    for i, cached in enumerate(redis_client.mget(keys)):
+        if cached:
+            embeddings[i] = np.frombuffer(cached, dtype=np.float32)
+        else:
+            misses.append(i)
+    if not misses:
+        return embeddings
+
+    response = get_openai_client().embeddings.create(
+        model=EMBEDDING_MODEL,
+        input=[texts[i] for i in misses],
+        encoding_format="base64",
+    )
+    pipe = redis_client.pipeline(transaction=False)
+    for item in response.data:
+        row = misses[item.index]
+        raw = _decode_embedding(item.embedding)
+        embeddings[row] = np.frombuffer(raw, dtype=np.float32)
+        pipe.set(keys[row], raw, ex=QUERY_EMBEDDING_TTL)
+    pipe.execute()
+    return embeddings
+
+
+def _decode_embedding(data):
+    """Decode a base64 embedding from the API into raw float32 bytes.
+
+    Asking the API for base64 lets the vector go straight from the response
+    to bytes, instead of through a list of 1536 Python floats that is then
+    converted back to float32.
     """
-    query_embedding = np.array(get_embedding(query_text), dtype=np.float32)
+    return base64.b64decode(data)
+
+
+@functools.lru_cache(maxsize=64)
+def _knn_query(top_k, filter_expr, with_embedding=False):
+    """Build the KNN query used by semantic search.
 
+    Queries are cached per argument combination and reused across calls;
+    searching does not modify them.
+    """
     query = (
         Query(f"({filter_expr})=>[KNN {top_k} @embedding $query_vec AS score]")
         .sort_by("score")
         .return_fields(
-            "score", "name", "race", "role", "region", "description", "how_to_beat_tips"
+            "score", "name", "race", "role", "region", "description_short", "how_to_beat_tips"
         )
         .dialect(2)
     )
+    if with_embedding:
+        # Returned as raw float32 bytes for client-side rescoring
+        query.return_field("embedding", decode_field=False)
+    return query
+
+
+def semantic_search(query_text, top_k=3, filter_expr="*", rerank=False):
+    """
+    Search by semantic similarity.
+
+    Args:
+        query_text: Natural language query
+        top_k: Number of results to return
+        filter_expr: Optional filter (e.g., "@region:{The Continent}")
+        rerank: Fetch extra candidates from the approximate HNSW index and
+            rescore them exactly against the query embedding
+
+    Returns:
+        List of matching entries with scores
+    """
+    # Identical searches within QUERY_RESULT_TTL are answered from Redis
+    result_key = f"{QUERY_RESULT_PREFIX}{_query_hash(query_text)}:{top_k}:{filter_expr}:{int(rerank)}"
+    cached = redis_client.get(result_key)
+    if cached:
+        return [Document(**fields) for fields in json.loads(cached)]
+
+    query_embedding = get_embedding(query_text)
+
+    if rerank:
+        results = redis_client.ft(INDEX_NAME).search(
+            _knn_query(top_k * RERANK_CANDIDATE_FACTOR, filter_expr, with_embedding=True),
+            {"query_vec": query_embedding.tobytes()},
+        )
+        docs = _rerank(results.docs, query_embedding, top_k)
+    else:
+        results = redis_client.ft(INDEX_NAME).search(
+            _knn_query(top_k, filter_expr), {"query_vec": query_embedding.tobytes()}
+        )
+        docs = results.docs
 
-    results = redis_client.ft(INDEX_NAME).search(
-        query, {"query_vec": query_embedding.tobytes()}
+    redis_client.set(
+        result_key, json.dumps([doc.__dict__ for doc in docs]), ex=QUERY_RESULT_TTL
     )
+    return docs
+
+
+def _rerank(docs, query_embedding, top_k):
+    """Rescore candidate docs by exact cosine similarity and keep the best top_k."""
+    if not docs:
+        return []
+
+    # One contiguous (N, VECTOR_DIM) matrix for all candidates
+    candidates = np.frombuffer(
+        b"".join(doc.embedding for doc in docs), dtype=np.float32
+    ).reshape(-1, VECTOR_DIM)
+    similarities = candidates @ query_embedding
+    similarities /= np.linalg.norm(candidates, axis=1) * np.linalg.norm(query_embedding)
+
+    k = min(top_k, len(docs))
+    best = np.argpartition(-similarities, k - 1)[:k]
+    best = best[np.argsort(-similarities[best])]
+
+    reranked = []
+    for i in best:
+        doc = docs[i]
+        # Keep the cosine-distance convention of Redis KNN scores
+        doc.score = str(1 - float(similarities[i]))
+        del doc.embedding
+        reranked.append(doc)
+    return reranked
+
+
+def semantic_search_many(queries, top_k=3, filter_expr="*"):
+    """
+    Run several semantic searches with one embedding request and one Redis round trip.
+
+    Args:
+        queries: Natural language queries
+        top_k: Number of results to return per query
+        filter_expr: Optional filter applied to every query
 
-    return results.docs
+    Returns:
+        One list of matching entries per query, in the same order
+    """
+    if not queries:
+        return []
+
+    unique_queries = list(dict.fromkeys(queries))
+    embeddings = get_embeddings(unique_queries)
+    rows = {text: embeddings[i] for i, text in enumerate(unique_queries)}
+
+    query = _knn_query(top_k, filter_expr)
+    pipe = redis_client.ft(INDEX_NAME).pipeline(transaction=False)
+    for text in queries:
+        pipe.search(query, {"query_vec": rows[text].tobytes()})
+
+    # Pipelined searches come back as raw replies; parse them the way
+    # Search.search would
+    return [Result(reply, hascontent=True).docs for reply in pipe.execute()]
 
 
 def filter_search(filter_expr):
@@ -76,33 +264,37 @@ def filter_search(filter_expr):
         "@race:{Challenge}"
         "@race:{Secret}"
     """
-    query = Query(filter_expr).return_fields("name", "role", "region", "drops")
-    return redis_client.ft(INDEX_NAME).search(query).docs
+    return redis_client.ft(INDEX_NAME).search(_filter_query(filter_expr)).docs
+
+
+@functools.lru_cache(maxsize=64)
+def _filter_query(filter_expr):
+    """Build, once per expression, the query used by filter search."""
+    return Query(filter_expr).return_fields("name", "role", "region", "drops")
 
 
 def get_entry(entry_id):
     """Get a specific entry by ID (excludes binary embedding field)."""
-    fields = [
-        "id",
-        "name",
-        "race",
-        "role",
-        "locations",
-        "region",
-        "affiliation",
-        "quest",
-        "is_hostile",
-        "becomes_hostile",
-        "drops",
-        "description",
-        "lore",
-        "dialogue",
-        "weakness",
-        "resistance",
-        "how_to_beat_tips",
+    return get_entries([entry_id])[0]
+
+
+def get_entries(entry_ids):
+    """
+    Get several entries by ID in a single Redis round trip.
+
+    Args:
+        entry_ids: Entry IDs to fetch
+
+    Returns:
+        One dict of non-empty fields per ID, in the same order
+    """
+    pipe = redis_client.pipeline(transaction=False)
+    for entry_id in entry_ids:
+        pipe.hmget(f"npc:{entry_id}", ENTRY_FIELDS)
+    return [
+        {k: v.decode("utf-8") for k, v in zip(ENTRY_FIELDS, values) if v}
+        for values in pipe.execute()
     ]
-    values = redis_client.hmget(f"npc:{entry_id}", fields)
-    return {k: v for k, v in zip(fields, values) if v}
 
 
 def print_results(results, show_description=True):
@@ -112,13 +304,8 @@ def print_results(results, show_description=True):
         score_str = f" (similarity: {1 - float(score):.2f})" if score else ""
         print(f"\n{i}. {doc.name}{score_str}")
         print(f"   Type: {doc.race} | Role: {doc.role} | Region: {doc.region}")
-        if show_description and hasattr(doc, "description"):
-            desc = (
-                doc.description[:150] + "..."
-                if len(doc.description) > 150
-                else doc.description
-            )
-            print(f"   {desc}")
+        if show_description and hasattr(doc, "description_short"):
+            print(f"   {doc.description_short}")
 
 
 def main():
@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 from openai import OpenAI
 from redis.commands.search.field import TagField, TextField, VectorField
 from redis.commands.search.index_definition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
 
 # --- Configuration ---
 load_dotenv()
@@ -20,8 +21,22 @@ REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
 INDEX_NAME = "idx:npcs"
 NPC_PREFIX = "npc:"
+# Cached semantic search results written by query_npcs.py
+QUERY_RESULT_PREFIX = "qres:"
 VECTOR_DIM = 1536  # OpenAI text-embedding-3-small output dimension
 EMBEDDING_MODEL = "text-embedding-3-small"
+# HNSW graph parameters: neighbours per node, build-time and query-time candidate lists
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_RUNTIME = 10
+# Texts per embeddings request; keeps each request under the API's input limits
+EMBEDDING_BATCH_SIZE = 256
+# NPC writes buffered per pipeline flush
+PIPELINE_FLUSH_SIZE = 500
+# Characters of the description kept in the precomputed preview field
+DESCRIPTION_SHORT_LENGTH = 150
+# Throwaway KNN queries run after indexing so the first real query isn't cold
+WARMUP_QUERIES = 5
 
 # --- Connect to Redis ---
 # Note: decode_responses=False for binary vector data
@@ -45,34 +60,56 @@ print(f"Loaded {len(npcs)} NPCs")
 openai_client = OpenAI()
 
 
-def get_embeddings(texts: list[str]) -> list[list[float]]:
-    """Get embeddings for a list of texts using OpenAI API."""
-    response = openai_client.embeddings.create(
-        model=EMBEDDING_MODEL,
-        input=texts,
-    )
-    return [item.embedding for item in response.data]
+def get_embeddings(texts: list[str]) -> np.ndarray:
+    """Get embeddings for a list of texts using OpenAI API.
+
+    Texts are sent in chunks of EMBEDDING_BATCH_SIZE and written straight
+    into one preallocated float32 matrix of shape (len(texts), VECTOR_DIM).
+    """
+    embeddings = np.empty((len(texts), VECTOR_DIM), dtype=np.float32)
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        response = openai_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=texts[start:start + EMBEDDING_BATCH_SIZE],
+        )
+        for item in response.data:
+            embeddings[start + item.index] = item.embedding
+    return embeddings
 
 # --- Create Embeddings ---
 # Combine description + lore + dialogue + tips for richer embeddings
+EMBEDDING_TEXT_FIELDS = ("description", "lore", "dialogue", "how_to_beat_tips")
+
+
 def create_embedding_text(npc):
-    parts = [
-        npc.get("description", ""),
-        npc.get("lore", ""),
-        npc.get("dialogue", ""),
-        npc.get("how_to_beat_tips", "")
-    ]
-    return " ".join(parts)
+    return " ".join(npc.get(field, "") for field in EMBEDDING_TEXT_FIELDS)
+
+
+def create_description_short(description):
+    """Truncated description shown in search result listings."""
+    if len(description) > DESCRIPTION_SHORT_LENGTH:
+        return description[:DESCRIPTION_SHORT_LENGTH] + "..."
+    return description
 
 print("Generating embeddings via OpenAI API...")
 embedding_texts = [create_embedding_text(npc) for npc in npcs]
-embeddings = np.array(get_embeddings(embedding_texts), dtype=np.float32)
+embeddings = get_embeddings(embedding_texts)
 
 # --- Store NPCs in Redis ---
 print("Storing NPCs in Redis...")
-pipeline = client.pipeline()
-
-for npc, embedding in zip(npcs, embeddings):
+# Writes are independent, so no MULTI/EXEC; flushing in fixed-size chunks
+# bounds client memory and lets Redis start applying writes early
+pipeline = client.pipeline(transaction=False)
+
+# Zero-copy byte slices of the contiguous matrix, one per row; redis-py
+# sends memoryviews as-is, so no per-NPC bytes copy of the embedding is made
+embedding_bytes = memoryview(np.ascontiguousarray(embeddings)).cast("B")
+row_size = VECTOR_DIM * embeddings.itemsize
+embedding_rows = [
+    embedding_bytes[row * row_size:(row + 1) * row_size] for row in range(len(npcs))
+]
+
+for i, (npc, embedding) in enumerate(zip(npcs, embedding_rows), 1):
     key = f"{NPC_PREFIX}{npc['id']}"
 
     # Prepare document - convert lists to comma-separated strings for TAG fields
@@ -89,15 +126,20 @@ for npc, embedding in zip(npcs, embeddings):
         "becomes_hostile": str(npc["becomes_hostile"]).lower(),
         "drops": ",".join(npc["drops"]) if npc["drops"] else "",
         "description": npc["description"],
+        # Returned by searches instead of the full description, so result
+        # listings fetch and print it as-is
+        "description_short": create_description_short(npc["description"]),
         "lore": npc["lore"],
         "dialogue": npc.get("dialogue", ""),
         "weakness": npc.get("weakness", ""),
         "resistance": npc.get("resistance", ""),
         "how_to_beat_tips": npc.get("how_to_beat_tips", ""),
-        "embedding": embedding.tobytes()  # Store as raw bytes
+        "embedding": embedding  # Store as raw float32 bytes
     }
 
     pipeline.hset(key, mapping=doc)
+    if i % PIPELINE_FLUSH_SIZE == 0:
+        pipeline.execute()
 
 pipeline.execute()
 print(f"Stored {len(npcs)} NPCs")
@@ -130,11 +172,14 @@ schema = (
     TextField("how_to_beat_tips"),
     VectorField(
         "embedding",
-        "FLAT",
+        "HNSW",
         {
             "TYPE": "FLOAT32",
             "DIM": VECTOR_DIM,
             "DISTANCE_METRIC": "COSINE",
+            "M": HNSW_M,
+            "EF_CONSTRUCTION": HNSW_EF_CONSTRUCTION,
+            "EF_RUNTIME": HNSW_EF_RUNTIME,
         },
     ),
 )
@@ -146,6 +191,32 @@ client.ft(INDEX_NAME).create_index(
 )
 
 print(f"Created index: {INDEX_NAME}")
+
+# Cached search results describe the old data, so drop them
+stale_results = 0
+batch = []
+for key in client.scan_iter(match=f"{QUERY_RESULT_PREFIX}*", count=PIPELINE_FLUSH_SIZE):
+    batch.append(key)
+    if len(batch) >= PIPELINE_FLUSH_SIZE:
+        stale_results += client.delete(*batch)
+        batch = []
+if batch:
+    stale_results += client.delete(*batch)
+print(f"Cleared {stale_results} cached search results")
+
+# --- Warm Up Index ---
+# Random probes touch the HNSW entry points and vector blocks so the first
+# real query doesn't pay the cold-start cost
+warmup_query = (
+    Query("(*)=>[KNN 10 @embedding $query_vec AS score]")
+    .return_fields("score")
+    .dialect(2)
+)
+rng = np.random.default_rng()
+for _ in range(WARMUP_QUERIES):
+    probe = rng.standard_normal(VECTOR_DIM, dtype=np.float32)
+    client.ft(INDEX_NAME).search(warmup_query, {"query_vec": probe.tobytes()})
+print(f"Ran {WARMUP_QUERIES} warmup queries")
 print("\n--- Setup Complete ---")
 print(f"NPCs stored: {len(npcs)}")
 print(f"Index: {INDEX_NAME}")
@@ -2,6 +2,11 @@
 
 import sys
 import os
+import queue
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
 
 import logfire
 from dotenv import find_dotenv, load_dotenv
@@ -10,11 +15,26 @@ from game_state_agent.redis_store import GameStateStore
 from voice_agent.src.ptt import PTTHandler
 from voice_agent.src.audio import AudioRecorder, AudioPlayer
 from voice_agent.src.screenshot import ScreenCapture
-from voice_agent.src.stt import SpeechToText
+from voice_agent.src.stt import (
+    RealtimeTranscriptionSession,
+    SpeechToText,
+    TranscriptionSession,
+)
 from voice_agent.src.tts import TextToSpeech
 from voice_agent.src.coach import Coach
 
 
+class _Turn(NamedTuple):
+    """A finished push-to-talk recording waiting to be answered."""
+    audio_bytes: bytes
+    stt_session: TranscriptionSession | RealtimeTranscriptionSession | None
+    screenshot: Future[str] | None
+
+
+# Queued to reset the game state and conversation between turns
+_RESET = object()
+
+
 class GamingCoach:
     """Main orchestrator for the gaming coach voice agent."""
 
@@ -24,16 +44,25 @@ class GamingCoach:
         self._ptt = PTTHandler()
         self._recorder = AudioRecorder(sample_rate=16000)
         self._player = AudioPlayer()
-        self._screen = ScreenCapture(scale=0.5)
-        self._stt = SpeechToText()
+        self._screen = ScreenCapture()
+        self._stt = SpeechToText(silence_level=self._recorder.silence_level)
         self._tts = TextToSpeech()
         self._coach = Coach()
         self._game_store = GameStateStore()
+        # Screenshots are grabbed and encoded off the PTT thread while the
+        # user is still talking
+        self._screenshot_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="screenshot")
 
         # State
-        self._screenshot: bytes | None = None
+        self._screenshot_future: Future[str] | None = None
+        self._stt_session: TranscriptionSession | RealtimeTranscriptionSession | None = None
         self._running = False
 
+        # Recorded turns are answered on a worker thread so the key listener
+        # never waits on STT, the LLM or playback
+        self._turns: queue.Queue[_Turn | object | None] = queue.Queue()
+        self._turn_worker = threading.Thread(target=self._run_turns, name="voice-turns", daemon=True)
+
         # Register callbacks
         self._ptt.on_press(self._on_ptt_press)
         self._ptt.on_release(self._on_ptt_release)
@@ -43,62 +72,163 @@ class GamingCoach:
     def _on_ptt_press(self) -> None:
         """Called when PTT key is pressed."""
         print("\n[Recording...] ", end="", flush=True)
-        # Capture screenshot for context (stored for later use)
-        self._screenshot = self._screen.capture()
-        # Start recording audio
-        self._recorder.start()
+        # Start recording audio; it is transcribed in the background while
+        # the user keeps talking, streamed as it is recorded when realtime
+        # STT is available and otherwise one pause-delimited segment at a time
+        self._stt_session = self._stt.start_session(sample_rate=self._recorder.sample_rate)
+        if isinstance(self._stt_session, RealtimeTranscriptionSession):
+            # Audio is already streamed, so pauses only need to commit it
+            self._recorder.start(
+                on_audio=self._stt_session.send_audio, on_pause=self._stt_session.commit
+            )
+        else:
+            self._recorder.start(on_segment=self._stt_session.submit)
+        # Capture screenshot for context in the background; it is collected
+        # once the transcript is ready
+        self._screenshot_future = self._screenshot_pool.submit(self._screen.capture_data_url)
 
-    @logfire.instrument("voice_interaction")
     def _on_ptt_release(self) -> None:
         """Called when PTT key is released."""
         print("[Processing...]", flush=True)
 
-        # Stop recording and get audio
+        # Stop recording and get audio (flushes the final segment to the session)
         audio_bytes = self._recorder.stop()
+        stt_session, self._stt_session = self._stt_session, None
+        screenshot, self._screenshot_future = self._screenshot_future, None
 
         if not audio_bytes:
             logfire.info("No audio recorded")
             print("No audio recorded.")
+            # Closing the session can block, so leave it to the turn worker
+            # rather than stall the key listener
+            if stt_session:
+                self._turns.put(_Turn(b"", stt_session, None))
             return
 
+        self._turns.put(_Turn(audio_bytes, stt_session, screenshot))
+
+    def _run_turns(self) -> None:
+        """
+        Answer recorded turns in order until a None sentinel arrives.
+
+        Resets are queued with the turns, so one never runs while an answer
+        is using the conversation history.
+        """
+        while True:
+            items = [self._turns.get()]
+            # Questions asked while the previous answer was still being
+            # spoken are answered together in a single request
+            while not self._turns.empty():
+                items.append(self._turns.get_nowait())
+            # Still answer whatever was recorded before shutting down,
+            # which also finishes those turns' STT sessions
+            stop = None in items
+            if stop:
+                items = items[: items.index(None)]
+            turns = []
+            for item in items:
+                if item is _RESET:
+                    # Questions asked before the reset are answered first
+                    if turns:
+                        self._answer(turns)
+                        turns = []
+                    self._reset()
+                elif item.audio_bytes:
+                    turns.append(item)
+                else:
+                    self._close_session(item)
+            if turns:
+                self._answer(turns)
+            if stop:
+                return
+
+    @staticmethod
+    def _close_session(turn: _Turn) -> None:
+        """Finish the STT session of a turn that recorded no audio."""
+        try:
+            turn.stt_session.finish()
+        except Exception as e:
+            logfire.warn("Closing unused transcription session failed", error=str(e))
+
+    @logfire.instrument("voice_interaction")
+    def _answer(self, turns: list[_Turn]) -> None:
+        """Transcribe one or more queued turns and speak the coach's reply."""
         try:
-            # Transcribe audio
+            # Load the game state while the last segment is transcribed
+            self._coach.prefetch_context()
+
+            # Collect the transcripts; earlier segments are usually done already
             print("  Transcribing...", end=" ", flush=True)
-            transcript = self._stt.transcribe(audio_bytes)
+            transcript = " ".join(
+                text for text in (self._transcribe(turn) for turn in turns) if text
+            )
             print(f'"{transcript}"')
+            if len(turns) > 1:
+                logfire.info("Merged queued turns", turn_count=len(turns))
 
             if not transcript.strip():
                 logfire.info("No speech detected in audio")
                 print("  No speech detected.")
                 return
 
-            # Get coach response (with screenshot for vision)
-            print("  Thinking...", end=" ", flush=True)
-            response = self._coach.get_response(
+            # Get coach response (with the latest screenshot for vision)
+            print("  Thinking...", flush=True)
+            response = self._coach.stream_response(
                 user_message=transcript,
-                screenshot=self._screenshot,
+                screenshot_data_url=self._collect_screenshot(turns[-1].screenshot),
             )
-            print(f'"{response}"')
 
-            # Synthesize and play response
-            print("  Speaking...", flush=True)
-            audio_response = self._tts.synthesize(response)
-            with logfire.span("play_audio", audio_size_bytes=len(audio_response)):
-                self._player.play(audio_response)
+            # Speak each sentence as soon as it has been generated
+            print("  Speaking... ", end="", flush=True)
+            with logfire.span("play_audio"):
+                self._player.play_stream(self._tts.stream_text(self._echo(response)))
+            print()
 
         except Exception as e:
             logfire.exception("Voice interaction failed")
             print(f"\n  Error: {e}")
             # Try to speak a fallback message
             try:
-                fallback = self._tts.synthesize("Sorry, I couldn't process that.")
-                self._player.play(fallback)
+                self._player.play_stream(
+                    self._tts.stream("Sorry, I couldn't process that.", cacheable=True)
+                )
             except Exception:
                 logfire.error("Failed to speak fallback message")
                 print("  (Failed to speak fallback message)")
 
-        finally:
-            self._screenshot = None
+    def _transcribe(self, turn: _Turn) -> str:
+        """Finish transcribing a turn's recording."""
+        if turn.stt_session:
+            try:
+                text = turn.stt_session.finish()
+                if text is not None:
+                    return text.strip()
+                # No speech was detected while streaming; transcribe() checks
+                # the whole recording, so quiet speakers aren't dropped
+            except Exception as e:
+                logfire.warn(
+                    "Background transcription failed, uploading the whole recording",
+                    error=str(e),
+                )
+        return self._stt.transcribe(turn.audio_bytes).strip()
+
+    @staticmethod
+    def _collect_screenshot(screenshot: Future[str] | None) -> str | None:
+        """Wait briefly for the screenshot taken on PTT press, if there is one."""
+        if screenshot is None:
+            return None
+        try:
+            return screenshot.result(timeout=0.5)
+        except Exception as e:
+            logfire.warn("Screenshot unavailable", error=str(e))
+            return None
+
+    @staticmethod
+    def _echo(text_chunks: Iterator[str]) -> Iterator[str]:
+        """Print text chunks as they pass through."""
+        for chunk in text_chunks:
+            print(chunk, end="", flush=True)
+            yield chunk
 
     def _on_quit(self) -> None:
         """Called when ESC is pressed."""
@@ -107,6 +237,10 @@ class GamingCoach:
 
     def _on_reset(self) -> None:
         """Called when reset key (right CMD) is pressed."""
+        self._turns.put(_RESET)
+
+    def _reset(self) -> None:
+        """Clear the game state and conversation, on the turn worker."""
         self._game_store.delete()
         self._coach.clear_history()
         print("\n[Reset] Game state and conversation cleared")
@@ -127,11 +261,18 @@ class GamingCoach:
         print("=" * 50)
         print("\nReady! Waiting for input...")
 
-        # Start the PTT listener
+        # Start answering turns, then the PTT listener
+        self._turn_worker.start()
         self._ptt.start()
 
-        # Wait for quit signal
+        # Wait for quit signal, then let the current answer finish
         self._ptt.wait()
+        self._turns.put(None)
+        self._turn_worker.join()
+        self._player.close()
+        self._coach.close()
+        self._screenshot_pool.shutdown(wait=True)
+        self._screen.close()
 
         print("Goodbye!")
 
@@ -1,9 +1,9 @@
 """Audio recording and playback using sounddevice."""
 
-import io
-import wave
-import threading
+import struct
+from collections.abc import Buffer, Iterable
 from pathlib import Path
+from typing import Callable
 
 import numpy as np
 import sounddevice as sd
@@ -13,44 +13,158 @@ import soundfile as sf
 class AudioRecorder:
     """Records audio from the default microphone."""
 
-    def __init__(self, sample_rate: int = 16000, channels: int = 1):
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        max_seconds: float = 60.0,
+        pause_seconds: float = 0.6,
+        silence_level: float = 500.0,
+        min_segment_seconds: float = 1.0,
+    ):
         """
         Initialize the audio recorder.
 
         Args:
             sample_rate: Sample rate in Hz. Default 16000 for speech.
             channels: Number of audio channels. Default 1 (mono).
+            max_seconds: Longest recording kept; audio beyond it is dropped.
+            pause_seconds: Silence after speech that ends a segment.
+            silence_level: RMS level (int16 scale) below which a block is silent.
+            min_segment_seconds: Shortest segment emitted before release.
         """
         self._sample_rate = sample_rate
         self._channels = channels
+        self._frame_bytes = channels * 2  # 16-bit = 2 bytes per sample
+        self._pause_bytes = int(pause_seconds * sample_rate) * self._frame_bytes
+        self._silence_level = silence_level
+        self._min_segment_bytes = int(min_segment_seconds * sample_rate) * self._frame_bytes
         self._recording = False
-        self._audio_chunks: list[np.ndarray] = []
-        self._stream: sd.InputStream | None = None
-        self._lock = threading.Lock()
+        self._stream: sd.RawInputStream | None = None
+
+        # Raw int16 PCM, preallocated so the audio callback never allocates.
+        # Only the audio thread writes while the stream runs, and start()/stop()
+        # touch it only while the stream is stopped, so no lock is needed.
+        # Positions below are byte offsets into it.
+        self._buffer = bytearray(int(max_seconds * sample_rate) * self._frame_bytes)
+        self._buffer_view = memoryview(self._buffer)
+        self._write_pos = 0
+        self._overflowed = False
+
+        # Streaming and pause segmentation state
+        self._on_audio: Callable[[bytes], None] | None = None
+        self._on_segment: Callable[[bytes], None] | None = None
+        self._on_pause: Callable[[], None] | None = None
+        self._segment_start = 0
+        self._segments_emitted = 0
+        self._silent_bytes = 0
+        self._heard_speech = False
+
+    @property
+    def sample_rate(self) -> int:
+        """Sample rate of the recorded audio in Hz."""
+        return self._sample_rate
+
+    @property
+    def silence_level(self) -> float:
+        """RMS level (int16 scale) below which a block counts as silent."""
+        return self._silence_level
 
     def _audio_callback(
         self,
-        indata: np.ndarray,
+        indata: Buffer,
         frames: int,
         time_info: dict,
         status: sd.CallbackFlags,
     ) -> None:
-        """Callback function for audio stream."""
+        """Callback function for audio stream; indata is raw int16 PCM."""
         if status:
             print(f"Audio status: {status}")
-        if self._recording:
-            with self._lock:
-                self._audio_chunks.append(indata.copy())
-
-    def start(self) -> None:
-        """Start recording (non-blocking, buffers in background)."""
-        with self._lock:
-            self._audio_chunks = []
+        if not self._recording:
+            return
+
+        size = len(indata)
+        start = self._write_pos
+        end = min(start + size, len(self._buffer))
+        if end < start + size and not self._overflowed:
+            self._overflowed = True
+            print("Audio status: recording buffer full, dropping further audio")
+        self._buffer_view[start:end] = memoryview(indata)[: end - start]
+        self._write_pos = end
+
+        if self._on_audio:
+            # indata is only valid during the callback, so hand over a copy
+            self._on_audio(bytes(memoryview(indata)))
+        if self._on_segment or self._on_pause:
+            self._track_pause(indata)
+
+    def _track_pause(self, indata: Buffer) -> None:
+        """Emit the audio so far as a segment once the speaker pauses."""
+        samples = np.frombuffer(indata, dtype=np.int16)
+        level = np.sqrt(np.mean(np.square(samples, dtype=np.float32)))
+        if level < self._silence_level:
+            self._silent_bytes += len(indata)
+        else:
+            self._silent_bytes = 0
+            self._heard_speech = True
+
+        segment_bytes = self._write_pos - self._segment_start
+        if (
+            self._heard_speech
+            and self._silent_bytes >= self._pause_bytes
+            and segment_bytes >= self._min_segment_bytes
+        ):
+            self._emit_segment()
+
+    def _emit_segment(self) -> None:
+        """End the current segment, handing its audio to the segment callback if set."""
+        start, self._segment_start = self._segment_start, self._write_pos
+        self._segments_emitted += 1
+        self._heard_speech = False
+        if self._on_segment:
+            self._on_segment(self._wav_bytes(start, self._write_pos))
+        if self._on_pause:
+            self._on_pause()
+
+    def start(
+        self,
+        on_segment: Callable[[bytes], None] | None = None,
+        on_audio: Callable[[bytes], None] | None = None,
+        on_pause: Callable[[], None] | None = None,
+    ) -> None:
+        """
+        Start recording (non-blocking, buffers in background).
+
+        Both callbacks are called from the audio thread and must return quickly.
+
+        Args:
+            on_segment: Optional callback receiving WAV bytes for each stretch
+                of speech as soon as the speaker pauses, so it can be processed
+                while recording continues. The remainder is delivered on stop().
+            on_audio: Optional callback receiving each block of raw int16 PCM
+                as soon as it is recorded, for streaming.
+            on_pause: Optional callback called with no arguments wherever
+                on_segment would end a segment, for consumers of on_audio that
+                only need the boundaries. Unlike on_segment, it is not called
+                for a recording in which no speech was detected, and nothing
+                is copied for it.
+        """
+        self._write_pos = 0
+        self._overflowed = False
+        self._on_audio = on_audio
+        self._on_segment = on_segment
+        self._on_pause = on_pause
+        self._segment_start = 0
+        self._segments_emitted = 0
+        self._silent_bytes = 0
+        self._heard_speech = False
         self._recording = True
-        stream = sd.InputStream(
+        # The raw stream hands the callback PortAudio's int16 buffer as-is
+        # instead of wrapping every block in a numpy array
+        stream = sd.RawInputStream(
             samplerate=self._sample_rate,
             channels=self._channels,
-            dtype=np.int16,
+            dtype="int16",
             callback=self._audio_callback,
         )
         stream.start()
@@ -69,21 +183,64 @@ class AudioRecorder:
             self._stream.close()
             self._stream = None
 
-        with self._lock:
-            if not self._audio_chunks:
-                return b""
-            audio_data = np.concatenate(self._audio_chunks, axis=0)
+        self._on_audio = None
+        # End the last segment if it holds speech. A recording with no
+        # detected speech at all is still delivered whole to on_segment, so
+        # quiet speakers aren't dropped; trailing silence after earlier
+        # segments is not
+        has_tail = self._write_pos > self._segment_start
+        if has_tail and self._heard_speech:
+            self._emit_segment()
+        elif has_tail and self._on_segment and not self._segments_emitted:
+            self._on_segment(self._wav_bytes(self._segment_start, self._write_pos))
+        self._on_segment = None
+        self._on_pause = None
+        if not self._write_pos:
+            return b""
+        return self._wav_bytes(0, self._write_pos)
 
-        # Convert to WAV bytes
-        buffer = io.BytesIO()
-        with wave.open(buffer, "wb") as wav_file:
-            wav_file.setnchannels(self._channels)
-            wav_file.setsampwidth(2)  # 16-bit = 2 bytes
-            wav_file.setframerate(self._sample_rate)
-            wav_file.writeframes(audio_data.tobytes())
+    def _wav_bytes(self, start: int, end: int) -> bytes:
+        """
+        Encode a span of the recording buffer as WAV.
 
-        buffer.seek(0)
-        return buffer.read()
+        Args:
+            start: Byte offset of the span in the buffer.
+            end: Byte offset just past the span.
+
+        Returns:
+            WAV format audio bytes.
+        """
+        samples = self._buffer_view[start:end]
+        # Header and samples are joined in a single allocation
+        return self._wav_header(len(samples)) + samples
+
+    def _wav_header(self, data_size: int) -> bytes:
+        """
+        Build the 44-byte header of a 16-bit PCM WAV file.
+
+        Args:
+            data_size: Size of the PCM sample data in bytes.
+
+        Returns:
+            RIFF/WAVE header bytes.
+        """
+        block_align = self._frame_bytes
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF",
+            36 + data_size,
+            b"WAVE",
+            b"fmt ",
+            16,  # fmt chunk size
+            1,  # PCM
+            self._channels,
+            self._sample_rate,
+            self._sample_rate * block_align,
+            block_align,
+            16,  # bits per sample
+            b"data",
+            data_size,
+        )
 
     def is_recording(self) -> bool:
         """Check if currently recording."""
@@ -93,23 +250,66 @@ class AudioRecorder:
 class AudioPlayer:
     """Plays audio through the default output device."""
 
+    def __init__(self, sample_rate: int = 24000):
+        """
+        Open the output stream so the first playback doesn't pay for it.
+
+        Args:
+            sample_rate: Sample rate the stream is opened at. Default 24000
+                for ElevenLabs.
+        """
+        self._stream: sd.RawOutputStream | None = None
+        self._open(sample_rate)
+
     def play(self, audio_data: bytes, sample_rate: int = 24000) -> None:
         """
-        Play raw PCM audio bytes. Blocks until complete.
+        Play raw PCM audio bytes. Blocks until the audio has been handed to the device.
 
         Args:
             audio_data: Raw PCM audio bytes (16-bit mono).
             sample_rate: Sample rate of the audio. Default 24000 for ElevenLabs.
         """
-        if not audio_data:
-            return
+        self.play_stream([audio_data], sample_rate)
 
-        # Convert bytes to numpy array (16-bit signed integers)
-        audio_array = np.frombuffer(audio_data, dtype=np.int16)
+    def play_stream(self, chunks: Iterable[bytes], sample_rate: int = 24000) -> None:
+        """
+        Play raw PCM audio as it arrives, e.g. straight from a TTS stream.
 
-        # Play and wait for completion
-        sd.play(audio_array, sample_rate)
-        sd.wait()
+        Playback starts with the first chunk, so latency is the time to the
+        first chunk rather than the whole download. Blocks until the last
+        chunk has been handed to the device.
+
+        Args:
+            chunks: Raw PCM audio chunks (16-bit mono). A chunk may end
+                mid-sample; the odd byte is carried over to the next one.
+            sample_rate: Sample rate of the audio. Default 24000 for ElevenLabs.
+        """
+        stream = self._open(sample_rate)
+        pending = b""
+        for chunk in chunks:
+            if pending:
+                chunk = pending + chunk
+            usable = len(chunk) & ~1
+            pending = chunk[usable:]
+            if usable:
+                # The raw stream takes the bytes as-is, with no numpy wrapper
+                stream.write(memoryview(chunk)[:usable])
+
+    def close(self) -> None:
+        """Close the output stream."""
+        if self._stream:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def _open(self, sample_rate: int) -> sd.RawOutputStream:
+        """Return a running output stream at the given rate, reopening if needed."""
+        if self._stream and self._stream.samplerate != sample_rate:
+            self.close()
+        if self._stream is None:
+            self._stream = sd.RawOutputStream(samplerate=sample_rate, channels=1, dtype="int16")
+            self._stream.start()
+        return self._stream
 
     def play_file(self, path: Path) -> None:
         """
@@ -1,14 +1,29 @@
 """Gaming Coach LLM using OpenAI with semantic caching."""
 
-import base64
 import os
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 
+import httpx
 import logfire
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI, Stream
+from openai.types.chat import ChatCompletionChunk
 
 from .context import ContextProvider
-from .semantic_cache import SemanticCache
-
+from .rate_limit import RateLimiter
+from .semantic_cache import CacheHit, SemanticCache
+
+# Shorter questions skip the semantic cache: they are too vague to match
+# reliably, so embedding them for a lookup is almost always wasted
+MIN_SEMANTIC_CACHE_WORDS = 3
+# Routes requests sharing the static system prompt prefix to the same
+# OpenAI prompt cache
+PROMPT_CACHE_KEY = "gaming-coach"
+# Flat token cost OpenAI charges for a low-detail image
+LOW_DETAIL_IMAGE_TOKENS = 85
 
 DEFAULT_SYSTEM_PROMPT = """<role_and_objective>
 You are a real-time voice assistant for Clair Obscur: Expedition 33 players.
@@ -103,6 +118,7 @@ class Coach:
         max_history: int = 20,
         enable_cache: bool = True,
         enable_context: bool = True,
+        max_completion_tokens: int = 150,
     ):
         """
         Initialize the coach.
@@ -114,56 +130,125 @@ class Coach:
             max_history: Maximum number of messages to keep in history.
             enable_cache: Whether to enable semantic caching.
             enable_context: Whether to fetch game state and NPC context from Redis.
+            max_completion_tokens: Token limit per response. The default keeps
+                replies very concise for speech.
         """
         self._api_key = api_key or os.environ.get("OPENAI_API_KEY")
         if not self._api_key:
             raise ValueError(
                 "OpenAI API key required. Set OPENAI_API_KEY env var or pass api_key."
             )
-        self._client = OpenAI(api_key=self._api_key)
+        # One long-lived pool for chat, embeddings and vision requests; the
+        # long keep-alive spans the gap between push-to-talk turns so warm
+        # connections skip the TCP + TLS handshake
+        self._http = DefaultHttpxClient(
+            limits=httpx.Limits(
+                max_connections=64, max_keepalive_connections=32, keepalive_expiry=60.0
+            ),
+            timeout=httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0),
+        )
+        self._client = OpenAI(api_key=self._api_key, http_client=self._http)
+        # Paces bursts of turns below the account limits instead of letting
+        # them run into 429s and the SDK's retry backoff
+        self._limiter = RateLimiter()
         self._model = model
+        self._max_completion_tokens = max_completion_tokens
         self._system_prompt = system_prompt or DEFAULT_SYSTEM_PROMPT
-        self._max_history = max_history
-        self._history: list[dict] = []
-        self._cache = SemanticCache() if enable_cache else None
+        # Built once and reused so the prompt prefix is identical every turn
+        self._system_message = {"role": "system", "content": self._system_prompt}
+        # Bounded, so appends drop the oldest message without re-slicing
+        self._history: deque[dict] = deque(maxlen=max_history)
         self._context = (
             ContextProvider(openai_client=self._client) if enable_context else None
         )
+        # With context enabled, the NPC search embeds every question anyway,
+        # so the cache can match near-duplicates locally at no extra cost
+        self._cache = (
+            SemanticCache(embedder=self._context.embed if self._context else None)
+            if enable_cache
+            else None
+        )
+        # Regenerates borderline cache hits after they have been answered,
+        # so the turn never waits on the LLM for them
+        self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-refresh")
+        if self._context:
+            self._context.warmup()
+        threading.Thread(target=self._warmup, name="coach-warmup", daemon=True).start()
+
+    def _warmup(self) -> None:
+        """Open the OpenAI and LangCache connections before the first turn."""
+        start = time.perf_counter()
+        try:
+            self._client.models.retrieve(self._model)
+        except Exception as e:
+            logfire.warn("OpenAI warmup failed", error=str(e))
+        if self._cache:
+            # warmup() logs and swallows its own failures
+            self._cache.warmup()
+        logfire.info("Coach warmup completed", duration_seconds=time.perf_counter() - start)
+
+    def prefetch_context(self) -> None:
+        """Start fetching the question-independent context ahead of the next question."""
+        if self._context:
+            self._context.prefetch()
 
-    @logfire.instrument("Coach.get_response")
     def get_response(
         self,
         user_message: str,
-        screenshot: bytes | None = None,
+        screenshot_data_url: str | None = None,
     ) -> str:
         """
         Get coaching response.
 
         Args:
             user_message: The user's transcribed question.
-            screenshot: Optional screenshot bytes (JPEG) for vision models.
+            screenshot_data_url: Optional screenshot as a JPEG data URL for vision models.
 
         Returns:
             Coach's response text.
         """
+        return "".join(self.stream_response(user_message, screenshot_data_url))
+
+    @logfire.instrument("Coach.stream_response")
+    def stream_response(
+        self,
+        user_message: str,
+        screenshot_data_url: str | None = None,
+    ) -> Iterator[str]:
+        """
+        Get coaching response as text chunks while it is being generated.
+
+        The cache lookup, context fetch and request happen before this
+        returns; the model's output then arrives through the iterator, so
+        speech can start before generation finishes. History and the cache
+        are updated once the iterator is exhausted.
+
+        Args:
+            user_message: The user's transcribed question.
+            screenshot_data_url: Optional screenshot as a JPEG data URL for vision models.
+
+        Returns:
+            Iterator over chunks of the coach's response text.
+        """
         if not user_message.strip():
-            return "I didn't catch that. Could you repeat your question?"
+            return iter(["I didn't catch that. Could you repeat your question?"])
 
-        # Try semantic cache first (only for text-only queries without screenshots)
-        if not screenshot and self._cache and self._cache.enabled:
-            cached_response = self._cache.search(user_message)
-            if cached_response:
+        # Try the caches first (only for text-only queries without screenshots)
+        if not screenshot_data_url and self._cache:
+            hit = self._cache_lookup(user_message)
+            if hit:
                 logfire.info(
                     "Cache hit for query",
                     query_preview=user_message[:50],
+                    confident=hit.confident,
                     cache_hit=True,
                 )
+                if not hit.confident:
+                    self._refresher.submit(self._refresh_cache, user_message)
                 # Add to history so conversation context stays consistent
                 self._history.append({"role": "user", "content": user_message})
-                self._history.append({"role": "assistant", "content": cached_response})
-                if len(self._history) > self._max_history:
-                    self._history = self._history[-self._max_history :]
-                return cached_response
+                self._history.append({"role": "assistant", "content": hit.response})
+                return iter([hit.response])
 
         # Fetch context from Redis (game state + NPC search)
         context_str = None
@@ -174,20 +259,21 @@ class Coach:
                 logfire.info("Fetched context from Redis", has_context=True)
 
         # Build the user message content
-        if screenshot:
-            # Vision-enabled request with image
-            b64_image = base64.b64encode(screenshot).decode("utf-8")
+        if screenshot_data_url:
+            # Vision-enabled request with image, already encoded as a data URL
             content = [
                 {"type": "text", "text": user_message},
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/jpeg;base64,{b64_image}"},
+                    # Low detail is a fixed, small token cost and plenty to
+                    # recognize the screen, so prefill stays fast
+                    "image_url": {"url": screenshot_data_url, "detail": "low"},
                 },
             ]
             logfire.info(
                 "Processing vision request",
                 has_screenshot=True,
-                screenshot_size_bytes=len(screenshot),
+                screenshot_size_bytes=len(screenshot_data_url),
             )
         else:
             content = user_message
@@ -195,58 +281,183 @@ class Coach:
         # Add user message to history
         self._history.append({"role": "user", "content": content})
 
-        # Trim history if needed
-        if len(self._history) > self._max_history:
-            self._history = self._history[-self._max_history :]
+        # Build messages with system prompt and earlier turns first: that
+        # prefix is byte-identical from one turn to the next, so OpenAI's
+        # prompt cache can skip prefilling it
+        messages = [self._system_message, *self._history]
+        question = messages.pop()
 
-        # Build messages with system prompt
-        messages = [
-            {"role": "system", "content": self._system_prompt},
-        ]
+        # Inject context, which changes every turn, just before the question
+        messages.extend(self._context_messages(context_str))
 
-        # Inject context as a separate message before history if available
-        if context_str:
-            messages.append(
-                {
-                    "role": "user",
-                    "content": f"Here is the current game context:\n\n{context_str}",
-                }
-            )
-            messages.append(
-                {
-                    "role": "assistant",
-                    "content": "Got it, I'll use this context to help answer your questions.",
-                }
-            )
-
-        # Add conversation history
-        messages.extend(self._history)
+        # Add the current question
+        messages.append(question)
 
-        # Get response from OpenAI (auto-instrumented by logfire.instrument_openai())
-        response = self._client.chat.completions.create(
+        # Get response from OpenAI (auto-instrumented by logfire.instrument_openai()),
+        # keeping the raw response so its rate limit headers can be read
+        self._limiter.acquire(self._estimate_tokens(messages))
+        raw_response = self._client.chat.completions.with_raw_response.create(
             model=self._model,
             messages=messages,
-            max_completion_tokens=150,  # Keep responses very concise for speech
+            max_completion_tokens=self._max_completion_tokens,
+            prompt_cache_key=PROMPT_CACHE_KEY,
+            stream=True,
         )
+        self._limiter.update(raw_response.headers)
+        response = raw_response.parse()
 
-        assistant_message = response.choices[0].message.content or ""
+        return self._stream_completion(
+            response,
+            user_message,
+            cacheable=not screenshot_data_url,
+            has_context=context_str is not None,
+        )
 
-        # Add assistant response to history
-        self._history.append({"role": "assistant", "content": assistant_message})
+    def _stream_completion(
+        self,
+        response: Stream[ChatCompletionChunk],
+        user_message: str,
+        cacheable: bool,
+        has_context: bool,
+    ) -> Iterator[str]:
+        """
+        Yield response text as it streams in, then record the full message.
+
+        Args:
+            response: Streaming chat completion.
+            user_message: The user's question, used as the cache key.
+            cacheable: Whether the finished response may be stored in the cache.
+            has_context: Whether Redis context was sent, for logging.
+        """
+        parts: list[str] = []
+        try:
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            # Keep history consistent even if the caller stops early
+            assistant_message = "".join(parts)
+            self._history.append({"role": "assistant", "content": assistant_message})
 
         # Store in cache for future queries (only text-only queries)
-        if not screenshot and self._cache and self._cache.enabled:
-            self._cache.store(user_message, assistant_message)
+        if cacheable and self._cache:
+            self._cache_store(user_message, assistant_message)
 
         logfire.info(
             "Coach response generated",
             response_length=len(assistant_message),
             history_length=len(self._history),
-            has_context=context_str is not None,
+            has_context=has_context,
         )
 
-        return assistant_message
+    @staticmethod
+    def _context_messages(context_str: str | None) -> list[dict]:
+        """The exchange that hands the model this turn's game context, if any."""
+        if not context_str:
+            return []
+        return [
+            {
+                "role": "user",
+                "content": f"Here is the current game context:\n\n{context_str}",
+            },
+            {
+                "role": "assistant",
+                "content": "Got it, I'll use this context to help answer your questions.",
+            },
+        ]
+
+    @logfire.instrument("Coach.refresh_cache")
+    def _refresh_cache(self, user_message: str) -> None:
+        """
+        Generate a fresh answer for a borderline cache hit and store it.
+
+        Runs on the refresh thread after the cached answer has been spoken.
+        The question is asked without conversation history, matching how
+        cached answers are reused across conversations.
+        """
+        try:
+            # The prefetched game state belongs to the next turn
+            context_str = (
+                self._context.get_context_for_query(user_message, use_prefetch=False)
+                if self._context
+                else None
+            )
+            messages = [
+                self._system_message,
+                *self._context_messages(context_str),
+                {"role": "user", "content": user_message},
+            ]
+            self._limiter.acquire(self._estimate_tokens(messages))
+            raw_response = self._client.chat.completions.with_raw_response.create(
+                model=self._model,
+                messages=messages,
+                max_completion_tokens=self._max_completion_tokens,
+                prompt_cache_key=PROMPT_CACHE_KEY,
+            )
+            self._limiter.update(raw_response.headers)
+            response = raw_response.parse().choices[0].message.content
+        except Exception as e:
+            logfire.warn("Cache refresh failed", error=str(e))
+            return
+        if response:
+            self._cache_store(user_message, response)
+
+    def _estimate_tokens(self, messages: list[dict]) -> int:
+        """
+        Roughly estimate the tokens a request counts against the rate limit.
+
+        About four characters per token is close enough for pacing, and the
+        completion limit is included because OpenAI reserves it up front.
+        """
+        chars = 0
+        images = 0
+        for message in messages:
+            content = message["content"]
+            if isinstance(content, str):
+                chars += len(content)
+                continue
+            for part in content:
+                if part["type"] == "text":
+                    chars += len(part["text"])
+                else:
+                    images += 1
+        return chars // 4 + images * LOW_DETAIL_IMAGE_TOKENS + self._max_completion_tokens
+
+    def _cache_lookup(self, user_message: str) -> CacheHit | None:
+        """
+        Look a question up in the cache.
+
+        Exact repeats are answered locally by the cache. LangCache is only
+        consulted for questions long enough to plausibly match.
+
+        Args:
+            user_message: The user's question.
+
+        Returns:
+            The cache hit, or None on a miss.
+        """
+        return self._cache.search(user_message, semantic=self._semantic_cacheable(user_message))
+
+    def _cache_store(self, user_message: str, response: str) -> None:
+        """Record a response locally and, for long enough questions, in LangCache."""
+        self._cache.store(user_message, response, semantic=self._semantic_cacheable(user_message))
+
+    @staticmethod
+    def _semantic_cacheable(user_message: str) -> bool:
+        """Whether a question is long enough to go to the semantic cache."""
+        return len(user_message.split()) >= MIN_SEMANTIC_CACHE_WORDS
 
     def clear_history(self) -> None:
         """Clear conversation history."""
-        self._history = []
+        self._history.clear()
+
+    def close(self) -> None:
+        """Finish pending cache refreshes and writes, then close the HTTP connection pools."""
+        self._refresher.shutdown(wait=True, cancel_futures=True)
+        if self._cache:
+            self._cache.close()
+        self._http.close()
@@ -1,9 +1,12 @@
 """Context provider for enriching LLM queries with game state and NPC data."""
 
+import base64
+import functools
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import logfire
-import numpy as np
 import redis
 from openai import OpenAI
 from redis.commands.search.query import Query
@@ -42,6 +45,30 @@ class ContextProvider:
             decode_responses=True,
         )
         self._game_store = GameStateStore(client=self._redis)
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-prefetch")
+        self._game_state_future: Future[GameState | None] | None = None
+
+    def warmup(self) -> None:
+        """Prime the NPC search path on a background thread.
+
+        Without this the first NPC search pays the TLS handshake to the
+        embeddings endpoint, the Redis connect and a cold vector index inside
+        the user's first turn.
+        """
+        threading.Thread(target=self._warmup, name="context-warmup", daemon=True).start()
+
+    def _warmup(self) -> None:
+        """Run one throwaway NPC search; search_npcs already logs its failures."""
+        with logfire.span("context_warmup"):
+            self.search_npcs("warmup", top_k=1)
+
+    def prefetch(self) -> None:
+        """Start loading the game state in the background for the next query.
+
+        The game state doesn't depend on the question, so it can load while
+        the question is still being transcribed.
+        """
+        self._game_state_future = self._prefetch_pool.submit(self.get_game_state)
 
     @logfire.instrument("get_game_state")
     def get_game_state(self) -> GameState | None:
@@ -56,14 +83,30 @@ class ContextProvider:
             logfire.warn("Failed to load game state from Redis", error=str(e))
             return None
 
+    def embed(self, text: str) -> bytes:
+        """Get the embedding for text as raw float32 bytes.
+
+        Shares the NPC search's embeddings, so a query embedded for the
+        semantic cache isn't embedded again for its NPC search.
+        """
+        return self._get_embedding(text)
+
+    @functools.lru_cache(maxsize=32)
     @logfire.instrument("get_embedding")
-    def _get_embedding(self, text: str) -> list[float]:
-        """Get embedding for text using OpenAI API."""
+    def _get_embedding(self, text: str) -> bytes:
+        """Get embedding for text using OpenAI API, as raw float32 bytes.
+
+        The API returns base64, which decodes straight into the bytes the
+        KNN query expects, with no list of Python floats in between. Recent
+        results are memoized, since a turn's query is embedded for both the
+        semantic cache and the NPC search.
+        """
         response = self._openai.embeddings.create(
             model=EMBEDDING_MODEL,
             input=text,
+            encoding_format="base64",
         )
-        return response.data[0].embedding
+        return base64.b64decode(response.data[0].embedding)
 
     @logfire.instrument("search_npcs")
     def search_npcs(self, query: str, top_k: int = 3) -> list[dict]:
@@ -77,7 +120,7 @@ class ContextProvider:
             List of NPC dictionaries with relevant fields, filtered by similarity threshold.
         """
         try:
-            query_embedding = np.array(self._get_embedding(query), dtype=np.float32)
+            query_embedding = self._get_embedding(query)
 
             search_query = (
                 Query(f"(*)=>[KNN {top_k} @embedding $query_vec AS score]")
@@ -95,7 +138,7 @@ class ContextProvider:
             )
 
             results = self._redis.ft(NPC_INDEX_NAME).search(
-                search_query, {"query_vec": query_embedding.tobytes()}
+                search_query, {"query_vec": query_embedding}
             )
 
             npcs = []
@@ -200,7 +243,9 @@ class ContextProvider:
 
         return "\n\n".join(parts)
 
-    def get_context_for_query(self, query: str, top_k: int = 3) -> str | None:
+    def get_context_for_query(
+        self, query: str, top_k: int = 3, use_prefetch: bool = True
+    ) -> str | None:
         """Get formatted context for a user query.
 
         This is a convenience method that fetches game state and searches NPCs,
@@ -209,10 +254,17 @@ class ContextProvider:
         Args:
             query: The user's question.
             top_k: Maximum number of NPC results.
+            use_prefetch: Whether to take the game state started by prefetch().
+                Only the caller that asked for the prefetch should, so pass
+                False from any other thread.
 
         Returns:
             Formatted context string, or None if no context is available.
         """
-        game_state = self.get_game_state()
+        # Use the game state prefetched for this query, if any
+        prefetched = None
+        if use_prefetch:
+            prefetched, self._game_state_future = self._game_state_future, None
+        game_state = prefetched.result() if prefetched else self.get_game_state()
         npc_results = self.search_npcs(query, top_k=top_k)
         return self.format_context(game_state, npc_results)
@@ -0,0 +1,41 @@
+"""Shared ElevenLabs client for speech-to-text and text-to-speech."""
+
+import functools
+from typing import TYPE_CHECKING
+
+import httpx
+
+if TYPE_CHECKING:
+    from elevenlabs import ElevenLabs
+
+
+@functools.lru_cache(maxsize=None)
+def get_elevenlabs_client(api_key: str) -> "ElevenLabs":
+    """
+    Get the ElevenLabs client for an API key, creating it on first use.
+
+    STT and TTS share it, so a TTS request right after a transcription
+    reuses the warm connection to api.elevenlabs.io instead of opening
+    its own.
+
+    Args:
+        api_key: ElevenLabs API key.
+
+    Returns:
+        An ElevenLabs client backed by a long-lived connection pool.
+    """
+    # Imported here since loading the SDK takes most of a second, and
+    # nothing needs it before the first client is created
+    from elevenlabs import ElevenLabs
+
+    # Keep connections alive across push-to-talk turns, which are usually
+    # further apart than httpx's 5 second default, so each request doesn't
+    # pay a fresh TCP + TLS handshake. The SDK takes its request timeout
+    # from this client, so keep its 240 second default rather than httpx's 5,
+    # which long transcriptions and slow first audio bytes would exceed
+    http = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=120.0),
+        timeout=httpx.Timeout(240.0, connect=5.0),
+        follow_redirects=True,
+    )
+    return ElevenLabs(api_key=api_key, httpx_client=http)
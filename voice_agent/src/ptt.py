@@ -1,9 +1,30 @@
-"""Push-to-Talk Handler using pynput."""
+"""Push-to-Talk Handler using pynput, or a Quartz event tap on macOS."""
 
+import sys
+import threading
 from collections.abc import Callable
 from pynput import keyboard
 from pynput.keyboard import Key
 
+try:
+    # Ships with pynput on macOS as one of its dependencies
+    import Quartz
+except ImportError:
+    Quartz = None
+
+# Modifier keycodes mapped to the device-specific event flag (NX_DEVICE*KEYMASK)
+# that is set while that particular key is held
+_MODIFIER_FLAGS = {
+    0x3B: 0x00001,  # left control
+    0x38: 0x00002,  # left shift
+    0x3C: 0x00004,  # right shift
+    0x37: 0x00008,  # left command
+    0x36: 0x00010,  # right command
+    0x3A: 0x00020,  # left option
+    0x3D: 0x00040,  # right option
+    0x3E: 0x02000,  # right control
+}
+
 
 class PTTHandler:
     """Handles push-to-talk keyboard events using pynput."""
@@ -25,6 +46,12 @@ class PTTHandler:
         self._listener: keyboard.Listener | None = None
         self._is_pressed = False
 
+        # Quartz event tap state (macOS only)
+        self._tap_keys: dict[int, Key] = {}
+        self._tap_thread: threading.Thread | None = None
+        self._tap_run_loop = None
+        self._tap = None
+
     def on_press(self, callback: Callable[[], None]) -> None:
         """Register callback for PTT key press."""
         self._on_press_callback = callback
@@ -65,6 +92,9 @@ class PTTHandler:
 
     def start(self) -> None:
         """Start listening for key events (non-blocking)."""
+        if sys.platform == "darwin" and Quartz is not None:
+            self._start_event_tap()
+            return
         self._listener = keyboard.Listener(
             on_press=self._handle_press,
             on_release=self._handle_release,
@@ -76,8 +106,91 @@ class PTTHandler:
         if self._listener:
             self._listener.stop()
             self._listener = None
+        if self._tap_run_loop is not None:
+            Quartz.CFRunLoopStop(self._tap_run_loop)
+            self._tap_run_loop = None
 
     def wait(self) -> None:
         """Wait for the listener to stop (blocks until ESC is pressed)."""
         if self._listener:
             self._listener.join()
+        if self._tap_thread:
+            self._tap_thread.join()
+            self._tap_thread = None
+
+    def _start_event_tap(self) -> None:
+        """
+        Listen through a Quartz event tap filtered to the keys we handle.
+
+        pynput hands every keystroke typed into any app to Python. This tap
+        is listen-only, so it never delays the user's typing, and its event
+        mask leaves key-down events out unless the PTT key needs them.
+        Modifier keys, such as the default PTT and reset keys, arrive as
+        flag changes instead.
+        """
+        self._tap_keys = {
+            key.value.vk: key for key in (self._ptt_key, self._reset_key, Key.esc)
+        }
+        mask = Quartz.CGEventMaskBit(Quartz.kCGEventFlagsChanged) | Quartz.CGEventMaskBit(
+            Quartz.kCGEventKeyUp
+        )
+        if any(key.value.vk not in _MODIFIER_FLAGS for key in (self._ptt_key, self._reset_key)):
+            mask |= Quartz.CGEventMaskBit(Quartz.kCGEventKeyDown)
+
+        self._tap = Quartz.CGEventTapCreate(
+            Quartz.kCGSessionEventTap,
+            Quartz.kCGHeadInsertEventTap,
+            Quartz.kCGEventTapOptionListenOnly,
+            mask,
+            self._tap_callback,
+            None,
+        )
+        if self._tap is None:
+            raise RuntimeError(
+                "Could not create keyboard event tap. Grant this terminal "
+                "Input Monitoring access in System Settings > Privacy & Security."
+            )
+
+        ready = threading.Event()
+        self._tap_thread = threading.Thread(
+            target=self._run_event_tap, args=(ready,), name="ptt-event-tap", daemon=True
+        )
+        self._tap_thread.start()
+        ready.wait()
+
+    def _run_event_tap(self, ready: threading.Event) -> None:
+        """Run the event tap on this thread's run loop until stop() is called."""
+        source = Quartz.CFMachPortCreateRunLoopSource(None, self._tap, 0)
+        self._tap_run_loop = Quartz.CFRunLoopGetCurrent()
+        Quartz.CFRunLoopAddSource(self._tap_run_loop, source, Quartz.kCFRunLoopCommonModes)
+        Quartz.CGEventTapEnable(self._tap, True)
+        ready.set()
+        Quartz.CFRunLoopRun()
+        Quartz.CGEventTapEnable(self._tap, False)
+        self._tap = None
+
+    def _tap_callback(self, proxy, event_type, event, refcon):
+        """Translate tapped events for our keys into press and release calls."""
+        if event_type in (
+            Quartz.kCGEventTapDisabledByTimeout,
+            Quartz.kCGEventTapDisabledByUserInput,
+        ):
+            Quartz.CGEventTapEnable(self._tap, True)
+            return event
+
+        vk = Quartz.CGEventGetIntegerValueField(event, Quartz.kCGKeyboardEventKeycode)
+        key = self._tap_keys.get(vk)
+        if key is None:
+            return event
+
+        if event_type == Quartz.kCGEventFlagsChanged:
+            flag = _MODIFIER_FLAGS.get(vk, 0)
+            pressed = bool(Quartz.CGEventGetFlags(event) & flag)
+        else:
+            pressed = event_type == Quartz.kCGEventKeyDown
+
+        if pressed:
+            self._handle_press(key)
+        else:
+            self._handle_release(key)
+        return event
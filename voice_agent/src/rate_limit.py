@@ -0,0 +1,105 @@
+"""Client-side pacing for OpenAI requests, kept in step with its rate limit headers."""
+
+import threading
+import time
+from collections.abc import Mapping
+
+import logfire
+
+
+class _Bucket:
+    """Token bucket that refills continuously up to a per-minute capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.available = min(
+            self.capacity, self.available + (now - self._updated) * self.capacity / 60.0
+        )
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take amount from the bucket, returning how long to wait until it is covered."""
+        self._refill(now)
+        # A single oversized request would otherwise wait forever
+        self.available -= min(amount, self.capacity)
+        if self.available >= 0:
+            return 0.0
+        return -self.available * 60.0 / self.capacity
+
+    def sync(self, limit: str | None, remaining: str | None, now: float) -> None:
+        """Adopt the server's view of the limit and what is left of it."""
+        try:
+            if limit is not None:
+                self.capacity = max(1.0, float(limit))
+            if remaining is not None:
+                self.available = min(self.capacity, float(remaining))
+                self._updated = now
+        except ValueError:
+            pass
+
+
+class RateLimiter:
+    """
+    Paces requests against both the requests/minute and tokens/minute limits.
+
+    Waiting here for a moment is much cheaper than a 429, which the SDK
+    answers with seconds of exponential backoff. The starting limits are
+    only a guess; every response's x-ratelimit-* headers correct them.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 30000):
+        """
+        Initialize the limiter.
+
+        Args:
+            requests_per_minute: Assumed request limit until a response says otherwise.
+            tokens_per_minute: Assumed token limit until a response says otherwise.
+        """
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._lock = threading.Lock()
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """
+        Block until a request of about estimated_tokens fits within both limits.
+
+        Args:
+            estimated_tokens: Prompt plus completion tokens the request may use.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(
+                self._requests.reserve(1, now),
+                self._tokens.reserve(estimated_tokens, now),
+            )
+        if wait > 0:
+            logfire.info(
+                "Pacing request for OpenAI rate limit",
+                wait_seconds=wait,
+                estimated_tokens=estimated_tokens,
+            )
+            time.sleep(wait)
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """
+        Update both buckets from a response's rate limit headers.
+
+        Args:
+            headers: Response headers; missing x-ratelimit-* values are ignored.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._requests.sync(
+                headers.get("x-ratelimit-limit-requests"),
+                headers.get("x-ratelimit-remaining-requests"),
+                now,
+            )
+            self._tokens.sync(
+                headers.get("x-ratelimit-limit-tokens"),
+                headers.get("x-ratelimit-remaining-tokens"),
+                now,
+            )
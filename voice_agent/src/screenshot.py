@@ -1,26 +1,55 @@
 """Screen capture using mss and PIL."""
 
-import base64
+import binascii
 import io
+import threading
+import time
 
 import logfire
 import mss
+from mss.base import MSSBase
+import numpy as np
 from PIL import Image
 
+_DATA_URL_PREFIX = b"data:image/jpeg;base64,"
+
 
 class ScreenCapture:
     """Captures screenshots of the primary display."""
 
-    def __init__(self, scale: float = 0.5, quality: int = 85):
+    def __init__(self, scale: float = 0.35, quality: int = 70, reuse_seconds: float = 0.5):
         """
         Initialize the screen capture.
 
         Args:
-            scale: Scale factor to reduce image size (0.5 = half size).
+            scale: Scale factor to reduce image size (0.5 = half size). The
+                default already exceeds what a low-detail vision request keeps.
             quality: JPEG quality (1-100). Lower = smaller file, lower quality.
+            reuse_seconds: Return the previous screenshot instead of capturing
+                again if it is at most this old (0 disables reuse).
         """
         self._scale = scale
         self._quality = quality
+        self._reuse_seconds = reuse_seconds
+        self._last_jpeg: bytes | None = None
+        self._last_capture_at = 0.0
+        self._local = threading.local()
+        self._handles: list[MSSBase] = []
+        self._handles_lock = threading.Lock()
+
+        # libjpeg-turbo encodes several times faster than Pillow; optional
+        self._turbojpeg = None
+        try:
+            from turbojpeg import TJPF_BGRX, TJPF_RGB, TJSAMP_420, TurboJPEG
+
+            self._turbojpeg = TurboJPEG()
+            self._tjpf_rgb = TJPF_RGB
+            self._tjpf_bgrx = TJPF_BGRX
+            self._tjsamp_420 = TJSAMP_420
+        except ImportError:
+            logfire.debug("PyTurboJPEG not installed, encoding screenshots with Pillow")
+        except Exception as e:
+            logfire.warn("Failed to load libjpeg-turbo, encoding screenshots with Pillow", error=str(e))
 
     @logfire.instrument("screenshot.capture")
     def capture(self) -> bytes:
@@ -30,14 +59,33 @@ class ScreenCapture:
         Returns:
             JPEG format image bytes.
         """
-        with mss.mss() as sct:
-            # Capture primary monitor (index 1, as 0 is "all monitors")
-            monitor = sct.monitors[1]
-            screenshot = sct.grab(monitor)
-
-            # Convert to PIL Image
-            img = Image.frombytes(
-                "RGB", screenshot.size, screenshot.bgra, "raw", "BGRX"
+        now = time.monotonic()
+        if self._last_jpeg and now - self._last_capture_at <= self._reuse_seconds:
+            logfire.info("Reusing recent screenshot", age_seconds=now - self._last_capture_at)
+            return self._last_jpeg
+
+        # mss handles are bound to the thread that created them, so each
+        # capturing thread keeps its own, opened once and reused
+        sct, monitor = self._mss()
+        screenshot = sct.grab(monitor)
+
+        if self._turbojpeg and self._scale == 1.0:
+            # Nothing to resize: libjpeg-turbo reads the native BGRA
+            # buffer through a zero-copy view
+            frame = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(
+                screenshot.height, screenshot.width, 4
+            )
+            jpeg_bytes = self._turbojpeg.encode(
+                frame,
+                quality=self._quality,
+                pixel_format=self._tjpf_bgrx,
+                jpeg_subsample=self._tjsamp_420,
+            )
+        else:
+            # Decode the native BGRA buffer in place; screenshot.bgra
+            # would first copy the whole frame into a new bytes object
+            img = Image.frombuffer(
+                "RGB", screenshot.size, screenshot.raw, "raw", "BGRX", 0, 1
             )
 
             # Scale down if needed
@@ -46,22 +94,72 @@ class ScreenCapture:
                     int(img.width * self._scale),
                     int(img.height * self._scale),
                 )
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
+                # Box-reduce by an integer factor first so LANCZOS only runs
+                # on an image at most twice the target size
+                img = img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
 
             # Convert to JPEG bytes
-            buffer = io.BytesIO()
-            img.save(buffer, format="JPEG", quality=self._quality)
-            buffer.seek(0)
-            jpeg_bytes = buffer.read()
-
-            logfire.info(
-                "Screenshot captured",
-                image_size_bytes=len(jpeg_bytes),
-                scale=self._scale,
+            jpeg_bytes = self._encode_jpeg(img)
+
+        logfire.info(
+            "Screenshot captured",
+            image_size_bytes=len(jpeg_bytes),
+            scale=self._scale,
+            quality=self._quality,
+            encoder="turbojpeg" if self._turbojpeg else "pillow",
+        )
+
+        self._last_jpeg = jpeg_bytes
+        self._last_capture_at = now
+        return jpeg_bytes
+
+    def _mss(self) -> tuple[MSSBase, dict]:
+        """
+        Get this thread's mss handle and the primary monitor, creating them on first use.
+
+        Returns:
+            The mss instance and the primary monitor (index 1, as 0 is "all monitors").
+        """
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss()
+            self._local.sct = sct
+            self._local.monitor = sct.monitors[1]
+            with self._handles_lock:
+                self._handles.append(sct)
+        return sct, self._local.monitor
+
+    def close(self) -> None:
+        """Release the mss handles opened by capturing threads."""
+        with self._handles_lock:
+            handles, self._handles = self._handles, []
+        for sct in handles:
+            sct.close()
+        self._local = threading.local()
+
+    def _encode_jpeg(self, img: Image.Image) -> bytes:
+        """
+        Encode an RGB image as JPEG, using libjpeg-turbo when available.
+
+        Chroma is subsampled 4:2:0 on both paths, which roughly halves the
+        payload against 4:4:4 with no visible loss for the vision model.
+
+        Args:
+            img: RGB image to encode.
+
+        Returns:
+            JPEG format image bytes.
+        """
+        if self._turbojpeg:
+            return self._turbojpeg.encode(
+                np.asarray(img),
                 quality=self._quality,
+                pixel_format=self._tjpf_rgb,
+                jpeg_subsample=self._tjsamp_420,
             )
-
-            return jpeg_bytes
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=self._quality, subsampling="4:2:0")
+        return buffer.getvalue()
 
     def capture_base64(self) -> str:
         """
@@ -71,4 +169,14 @@ class ScreenCapture:
             Base64-encoded JPEG string.
         """
         jpeg_bytes = self.capture()
-        return base64.b64encode(jpeg_bytes).decode("utf-8")
+        return binascii.b2a_base64(jpeg_bytes, newline=False).decode("ascii")
+
+    def capture_data_url(self) -> str:
+        """
+        Capture screen and return as a JPEG data URL, ready for an image_url part.
+
+        Returns:
+            "data:image/jpeg;base64,..." string, decoded to str exactly once.
+        """
+        jpeg_bytes = self.capture()
+        return (_DATA_URL_PREFIX + binascii.b2a_base64(jpeg_bytes, newline=False)).decode("ascii")
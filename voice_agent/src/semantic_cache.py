@@ -1,8 +1,48 @@
 """Semantic caching for LLM responses using LangCache."""
 
+import hashlib
 import os
+import queue
+import re
+import string
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
+import httpx
 import logfire
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+# Responses remembered in-process for exact repeats of a prompt
+LOCAL_CACHE_SIZE = 512
+# Prompt embeddings kept in-process for near-duplicate lookups
+LOCAL_INDEX_SIZE = 4096
+# Rows preallocated for the first embeddings; the index doubles from here
+INITIAL_INDEX_CAPACITY = 64
+# Writes waiting to be sent; beyond this the oldest are dropped
+WRITE_QUEUE_SIZE = 256
+# How long close() waits for queued writes to be sent
+WRITE_DRAIN_TIMEOUT = 5.0
+# LangCache has no batch endpoint, so a batch is sent as this many
+# concurrent writes over the shared connection pool
+WRITE_CONCURRENCY = 4
+# Lookups between cache statistics log lines
+STATS_LOG_EVERY = 50
+
+
+class CacheHit(NamedTuple):
+    """A cached response and how closely its prompt matched."""
+
+    response: str
+    similarity: float
+    # False for borderline matches, whose answer is worth regenerating
+    confident: bool
 
 
 class SemanticCache:
@@ -13,7 +53,11 @@ class SemanticCache:
         server_url: str | None = None,
         cache_id: str | None = None,
         api_key: str | None = None,
-        similarity_threshold: float = 0.9,
+        threshold_high: float = 0.92,
+        threshold_low: float = 0.8,
+        batch_size: int = 32,
+        batch_timeout: float = 2.0,
+        embedder: Callable[[str], bytes] | None = None,
     ):
         """
         Initialize semantic cache.
@@ -22,14 +66,48 @@ class SemanticCache:
             server_url: LangCache server URL. Falls back to LANGCACHE_SERVER_URL env var.
             cache_id: Cache ID. Falls back to LANGCACHE_CACHE_ID env var.
             api_key: LangCache API key. Falls back to LANGCACHE_API_KEY env var.
-            similarity_threshold: Minimum similarity score to consider a cache hit (0.0-1.0).
+            threshold_high: Similarity score (0.0-1.0) from which a hit is
+                confident and can be reused as-is.
+            threshold_low: Minimum similarity score to consider a cache hit.
+                Hits below threshold_high are returned as borderline.
+            batch_size: Most queued writes sent together in one batch.
+            batch_timeout: Seconds to keep collecting writes after the first
+                one arrives before the batch is sent.
+            embedder: Optional function returning a prompt's embedding as raw
+                float32 bytes. When given, prompts seen this session are also
+                matched locally by cosine similarity before asking LangCache.
         """
         self._server_url = server_url or os.environ.get("LANGCACHE_SERVER_URL")
         self._cache_id = cache_id or os.environ.get("LANGCACHE_CACHE_ID")
         self._api_key = api_key or os.environ.get("LANGCACHE_API_KEY")
-        self._similarity_threshold = similarity_threshold
+        self._threshold_high = threshold_high
+        self._threshold_low = threshold_low
+        self._batch_size = batch_size
+        self._batch_timeout = batch_timeout
         self._client = None
+        self._http: httpx.Client | None = None
+        # Prompt digest -> (response, similarity), least recently used first
+        self._local: OrderedDict[bytes, tuple[str, float]] = OrderedDict()
+        self._embedder = embedder
+        # Normalized prompt embeddings; the first _indexed rows are in use,
+        # one per entry in _indexed_responses. Capacity doubles as it fills,
+        # then the oldest row is overwritten
+        self._vectors: np.ndarray | None = None
+        self._indexed = 0
+        self._next_row = 0
+        self._indexed_responses: list[str] = []
+        self._local_lock = threading.Lock()
+        # Lookup outcomes since startup, for tuning the thresholds and sizes
+        self._hits = 0
+        self._borderline_hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._stats_lock = threading.Lock()
         self._enabled = False
+        self._writes: queue.Queue[tuple[str, str] | None] = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._writer: threading.Thread | None = None
+        self._writer_lock = threading.Lock()
+        self._write_pool: ThreadPoolExecutor | None = None
 
         if not all([self._server_url, self._cache_id, self._api_key]):
             logfire.warn(
@@ -41,10 +119,19 @@ class SemanticCache:
         try:
             from langcache import LangCache
 
+            # Lookups sit between transcription and the LLM call on every
+            # turn, so keep the TLS session to LangCache alive across turns
+            # and fail fast rather than stall the reply
+            self._http = httpx.Client(
+                limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=120.0),
+                timeout=httpx.Timeout(5.0),
+                follow_redirects=True,
+            )
             self._client = LangCache(
                 server_url=self._server_url,
                 cache_id=self._cache_id,
                 api_key=self._api_key,
+                client=self._http,
             )
             self._enabled = True
             logfire.info("Semantic cache enabled with LangCache")
@@ -58,31 +145,139 @@ class SemanticCache:
         """Check if semantic caching is enabled."""
         return self._enabled
 
-    @logfire.instrument("langcache.search")
-    def search(self, prompt: str) -> str | None:
+    def warmup(self) -> None:
+        """
+        Open the connection to LangCache before the first lookup.
+
+        Sends a throwaway search that skips the local tiers, the embedder
+        and the statistics, so it doesn't count as a lookup.
+        """
+        if not self._enabled or not self._client:
+            return
+        try:
+            self._client.search(prompt="warmup", similarity_threshold=self._threshold_low)
+        except Exception as e:
+            logfire.warn("Cache warmup failed", error=str(e))
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """
+        Lookup counts since startup.
+
+        Returns:
+            hits (including borderline_hits), borderline_hits, misses,
+            errors (failed LangCache searches and writes) and hit_rate,
+            the share of lookups answered from any tier.
+        """
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "borderline_hits": self._borderline_hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+    def search(self, prompt: str, semantic: bool = True) -> CacheHit | None:
         """
         Search for a cached response.
 
+        Prompts are normalized first, so variants differing only in case,
+        punctuation or spacing share one entry. Exact repeats are answered
+        from a local LRU without a round trip. With an embedder, close matches to
+        prompts seen this session are answered locally next, which also
+        covers entries whose LangCache write hasn't landed yet. LangCache is
+        only asked on a miss.
+
+        Matches scoring between threshold_low and threshold_high come back
+        with confident=False: the caller can still answer from them, and
+        should refresh the entry by storing a newly generated response.
+
         Args:
             prompt: The user prompt to search for.
+            semantic: Whether to fall back to LangCache on a local miss.
 
         Returns:
-            Cached response if found above threshold, None otherwise.
+            The cached response with its similarity if found above
+            threshold_low, None otherwise or for a blank prompt.
         """
+        normalized = self._normalize(prompt)
+        if not normalized:
+            return None
+        key = self._local_key(normalized)
+        with self._local_lock:
+            match = self._local.get(key)
+            if match is not None:
+                self._local.move_to_end(key)
+        if match is not None:
+            logfire.debug("Local cache hit", prompt_length=len(prompt), cache_hit=True)
+            return self._hit(*match)
+
+        if not semantic:
+            self._count_lookup(hit=False)
+            return None
+        # The embedder gets the prompt as asked, matching what the NPC search
+        # embeds, so its memoized vector is shared
+        vector = self._embed(prompt)
+        if vector is not None:
+            match = self._search_index(vector)
+            if match is not None:
+                self._remember(key, *match)
+                return self._hit(*match)
+        match = self._search_remote(normalized)
+        if match is not None:
+            self._remember(key, *match)
+            if vector is not None:
+                self._add_to_index(vector, match[0])
+            return self._hit(*match)
+        self._count_lookup(hit=False)
+        return None
+
+    def _hit(self, response: str, similarity: float) -> CacheHit:
+        """Wrap and count a match, marking whether it clears threshold_high."""
+        hit = CacheHit(response, similarity, similarity >= self._threshold_high)
+        self._count_lookup(hit=True, confident=hit.confident)
+        return hit
+
+    def _count_lookup(self, hit: bool, confident: bool = True) -> None:
+        """Record a lookup's outcome, logging the totals every STATS_LOG_EVERY lookups."""
+        with self._stats_lock:
+            if hit:
+                self._hits += 1
+                self._borderline_hits += not confident
+            else:
+                self._misses += 1
+            due = (self._hits + self._misses) % STATS_LOG_EVERY == 0
+        if due:
+            logfire.info("Semantic cache stats", **self.stats)
+
+    def _count_error(self) -> None:
+        """Record a failed LangCache request."""
+        with self._stats_lock:
+            self._errors += 1
+
+    @logfire.instrument("langcache.search")
+    def _search_remote(self, prompt: str) -> tuple[str, float] | None:
+        """Search LangCache for a response to a semantically similar prompt, with its score."""
         if not self._enabled or not self._client:
             return None
 
         try:
-            result = self._client.search(prompt=prompt)
-            if result and result.get("score", 0) >= self._similarity_threshold:
-                cached_response = result.get("response")
+            result = self._client.search(
+                prompt=prompt, similarity_threshold=self._threshold_low
+            )
+            # Entries come back best match first
+            best = result.data[0] if result.data else None
+            if best and best.similarity >= self._threshold_low:
                 logfire.info(
                     "Cache hit",
                     prompt_length=len(prompt),
-                    similarity_score=result.get("score", 0),
+                    similarity_score=best.similarity,
+                    confident=best.similarity >= self._threshold_high,
                     cache_hit=True,
                 )
-                return cached_response
+                return best.response, best.similarity
             logfire.debug(
                 "Cache miss",
                 prompt_length=len(prompt),
@@ -91,23 +286,181 @@ class SemanticCache:
             return None
         except Exception as e:
             logfire.warn("Cache search failed", error=str(e))
+            self._count_error()
             return None
 
-    @logfire.instrument("langcache.store")
-    def store(self, prompt: str, response: str) -> bool:
+    def store(self, prompt: str, response: str, semantic: bool = True) -> bool:
         """
-        Store a response in the cache.
+        Store a response locally and queue it to be stored in LangCache.
+
+        A stored response is an exact answer to its prompt, so later repeats
+        find it as a confident hit.
+
+        The LangCache write is sent by a background thread, so the caller
+        never waits on the network. If writes back up, the oldest queued one
+        is dropped.
 
         Args:
             prompt: The user prompt.
             response: The LLM response to cache.
+            semantic: Whether to store the response in LangCache as well.
 
         Returns:
-            True if stored successfully, False otherwise.
+            True if the LangCache write was queued, False otherwise.
         """
+        normalized = self._normalize(prompt)
+        if not normalized:
+            return False
+        self._remember(self._local_key(normalized), response, 1.0)
+        if not semantic:
+            return False
+        vector = self._embed(prompt)
+        if vector is not None:
+            self._add_to_index(vector, response)
         if not self._enabled or not self._client:
             return False
 
+        self._start_writer()
+        while True:
+            try:
+                self._writes.put_nowait((normalized, response))
+                return True
+            except queue.Full:
+                try:
+                    self._writes.get_nowait()
+                    logfire.warn("Cache write queue full, dropped oldest write")
+                except queue.Empty:
+                    pass
+
+    def _remember(self, key: bytes, response: str, similarity: float) -> None:
+        """Add an entry to the local LRU, evicting the oldest if full."""
+        with self._local_lock:
+            self._local[key] = (response, similarity)
+            self._local.move_to_end(key)
+            if len(self._local) > LOCAL_CACHE_SIZE:
+                self._local.popitem(last=False)
+
+    def _embed(self, prompt: str) -> np.ndarray | None:
+        """Unit-length embedding of a prompt, or None without a working embedder."""
+        if self._embedder is None:
+            return None
+        try:
+            vector = np.frombuffer(self._embedder(prompt), dtype=np.float32)
+        except Exception as e:
+            logfire.warn("Cache embedding failed", error=str(e))
+            return None
+        return vector / np.linalg.norm(vector)
+
+    def _search_index(self, vector: np.ndarray) -> tuple[str, float] | None:
+        """Closest locally indexed response and its score, if it clears threshold_low."""
+        with self._local_lock:
+            if not self._indexed:
+                return None
+            # Rows are unit length, so one matrix-vector product gives every
+            # cosine similarity
+            scores = self._vectors[: self._indexed] @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self._threshold_low:
+                return None
+            cached_response = self._indexed_responses[best]
+        logfire.info(
+            "Local semantic cache hit",
+            similarity_score=similarity,
+            confident=similarity >= self._threshold_high,
+            cache_hit=True,
+        )
+        return cached_response, similarity
+
+    def _add_to_index(self, vector: np.ndarray, response: str) -> None:
+        """Index a prompt embedding locally, overwriting the oldest entry if full."""
+        with self._local_lock:
+            if self._vectors is None:
+                self._vectors = np.empty((INITIAL_INDEX_CAPACITY, vector.size), dtype=np.float32)
+            if self._indexed < LOCAL_INDEX_SIZE:
+                if self._indexed == len(self._vectors):
+                    grown = np.empty(
+                        (min(2 * len(self._vectors), LOCAL_INDEX_SIZE), vector.size),
+                        dtype=np.float32,
+                    )
+                    grown[: self._indexed] = self._vectors
+                    self._vectors = grown
+                row = self._indexed
+                self._indexed += 1
+                self._indexed_responses.append(response)
+            else:
+                row = self._next_row
+                self._next_row = (row + 1) % LOCAL_INDEX_SIZE
+                self._indexed_responses[row] = response
+            self._vectors[row] = vector
+
+    @staticmethod
+    def _normalize(prompt: str) -> str:
+        """Lowercase a prompt and drop its punctuation and extra whitespace."""
+        return _WHITESPACE.sub(" ", prompt.lower().translate(_PUNCTUATION)).strip()
+
+    @staticmethod
+    def _local_key(normalized: str) -> bytes:
+        """Compact local LRU key for a normalized prompt."""
+        return hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+
+    def _start_writer(self) -> None:
+        """Start the background writer thread on first use."""
+        with self._writer_lock:
+            if self._writer is None:
+                self._write_pool = ThreadPoolExecutor(
+                    max_workers=WRITE_CONCURRENCY, thread_name_prefix="cache-write"
+                )
+                self._writer = threading.Thread(
+                    target=self._run_writer, name="cache-writer", daemon=True
+                )
+                self._writer.start()
+
+    def _run_writer(self) -> None:
+        """Send queued writes in batches until close() queues the None sentinel."""
+        closing = False
+        while not closing:
+            batch, closing = self._next_batch()
+            if len(batch) == 1:
+                self._write(*batch[0])
+            elif batch:
+                with logfire.span("langcache.store_batch", batch_size=len(batch)):
+                    list(self._write_pool.map(lambda item: self._write(*item), batch))
+
+    def _next_batch(self) -> tuple[list[tuple[str, str]], bool]:
+        """
+        Wait for a write, then collect more until the batch is full or times out.
+
+        Returns:
+            The batch, and whether the None sentinel was reached.
+        """
+        item = self._writes.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + self._batch_timeout
+        while len(batch) < self._batch_size:
+            try:
+                item = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    @logfire.instrument("langcache.store")
+    def _write(self, prompt: str, response: str) -> bool:
+        """
+        Store a response in the cache.
+
+        Args:
+            prompt: The user prompt.
+            response: The LLM response to cache.
+
+        Returns:
+            True if stored successfully, False otherwise.
+        """
         try:
             self._client.set(prompt=prompt, response=response)
             logfire.debug(
@@ -118,6 +471,7 @@ class SemanticCache:
             return True
         except Exception as e:
             logfire.warn("Cache store failed", error=str(e))
+            self._count_error()
             return False
 
     def __enter__(self):
@@ -125,5 +479,24 @@ class SemanticCache:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit - cleanup if needed."""
-        pass
+        """Context manager exit - closes the connection pool."""
+        self.close()
+
+    def close(self) -> None:
+        """Send queued writes, waiting up to WRITE_DRAIN_TIMEOUT, then close the connection pool."""
+        self._enabled = False
+        logfire.info("Semantic cache stats", **self.stats)
+        with self._writer_lock:
+            writer, self._writer = self._writer, None
+        if writer:
+            try:
+                self._writes.put(None, timeout=WRITE_DRAIN_TIMEOUT)
+                writer.join(WRITE_DRAIN_TIMEOUT)
+            except queue.Full:
+                pass
+            if writer.is_alive():
+                logfire.warn("Cache writes still pending at close", pending=self._writes.qsize())
+            self._write_pool.shutdown(wait=False)
+        if self._http:
+            self._http.close()
+            self._http = None
@@ -1,30 +1,112 @@
 """Speech-to-Text using ElevenLabs Scribe."""
 
-import os
+import asyncio
+import base64
+import functools
 import io
+import os
+import queue
+import threading
+from types import ModuleType
+from typing import TYPE_CHECKING
 
 import logfire
-from elevenlabs import ElevenLabs
+import numpy as np
+import soundfile as sf
+
+from .elevenlabs_client import get_elevenlabs_client
+
+if TYPE_CHECKING:
+    from elevenlabs import ElevenLabs
+
+# Longest wait in finish() for the realtime session to wrap up
+REALTIME_FINISH_TIMEOUT = 10.0
+# How long finish() waits for each outstanding committed transcript before
+# counting it as empty
+REALTIME_COMMIT_TIMEOUT = 2.0
+# Length of the frames whose RMS is compared against the silence level
+SILENCE_FRAME_SECONDS = 0.03
+# Audio is only skipped if its loudest frame stays under this share of the
+# silence level. Pause detection uses the full level, which quiet speakers
+# may never reach, while a silent mic stays well below it
+NOISE_FLOOR_FRACTION = 0.25
+# Queued in place of audio to commit what has been streamed so far
+_COMMIT = object()
+
+
+@functools.cache
+def _realtime() -> ModuleType | None:
+    """The SDK's realtime module, imported on first use, or None if unavailable."""
+    try:
+        # Realtime Scribe needs a recent elevenlabs release and the websockets package
+        from elevenlabs import realtime
+    except ImportError:
+        return None
+    return realtime
 
 
 class SpeechToText:
     """Transcribes audio using ElevenLabs Scribe."""
 
-    def __init__(self, api_key: str | None = None, model_id: str = "scribe_v1"):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model_id: str = "scribe_v1",
+        realtime_model_id: str | None = "scribe_v2_realtime",
+        silence_level: float = 500.0,
+    ):
         """
         Initialize the STT client.
 
         Args:
             api_key: ElevenLabs API key. Falls back to ELEVENLABS_API_KEY env var.
             model_id: The model to use for transcription.
+            realtime_model_id: Model for sessions that stream audio while it is
+                recorded, or None to transcribe each segment in one upload.
+                Ignored if the installed SDK lacks realtime support.
+            silence_level: RMS level (int16 scale) below which audio is
+                silent; should match the recorder's silence_level.
         """
         self._api_key = api_key or os.environ.get("ELEVENLABS_API_KEY")
         if not self._api_key:
             raise ValueError(
                 "ElevenLabs API key required. Set ELEVENLABS_API_KEY env var or pass api_key."
             )
-        self._client = ElevenLabs(api_key=self._api_key)
+        self._client = get_elevenlabs_client(self._api_key)
         self._model_id = model_id
+        self._realtime_model_id = realtime_model_id if _realtime() is not None else None
+        self._noise_floor = silence_level * NOISE_FLOOR_FRACTION
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_lock = threading.Lock()
+
+    def start_session(
+        self, sample_rate: int = 16000
+    ) -> "TranscriptionSession | RealtimeTranscriptionSession":
+        """
+        Start transcribing audio in the background while it is recorded.
+
+        Args:
+            sample_rate: Sample rate of the recorded audio, for realtime sessions.
+
+        Returns:
+            A realtime session streaming audio over a websocket if available,
+            otherwise a session that uploads each WAV segment as it is recorded.
+        """
+        if self._realtime_model_id:
+            return RealtimeTranscriptionSession(
+                self._event_loop(), self._client, self._realtime_model_id, sample_rate
+            )
+        return TranscriptionSession(self)
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop for realtime sessions, run on a background thread started on first use."""
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="stt-realtime", daemon=True
+                ).start()
+            return self._loop
 
     @logfire.instrument("elevenlabs.stt")
     def transcribe(self, audio_bytes: bytes) -> str:
@@ -35,23 +117,31 @@ class SpeechToText:
             audio_bytes: WAV format audio bytes.
 
         Returns:
-            Transcribed text.
+            Transcribed text, or "" for empty or near-silent audio.
         """
         if not audio_bytes:
             return ""
 
+        samples, sample_rate = sf.read(io.BytesIO(audio_bytes), dtype="int16")
+        peak = self._peak_frame_level(samples, sample_rate)
+        if peak < self._noise_floor:
+            logfire.info("Skipping silent audio", audio_size_bytes=len(audio_bytes), peak_rms=peak)
+            return ""
+
+        # Lossless FLAC is roughly half the size of WAV for speech, so the
+        # upload finishes sooner and the transcript is unchanged
+        flac_bytes = self._to_flac(samples, sample_rate)
         logfire.info(
             "Starting transcription",
             audio_size_bytes=len(audio_bytes),
+            upload_size_bytes=len(flac_bytes),
             model_id=self._model_id,
         )
 
-        # Create a file-like object from bytes
-        audio_file = io.BytesIO(audio_bytes)
-        audio_file.name = "audio.wav"  # ElevenLabs needs a filename
-
+        # A (filename, bytes, content type) tuple goes into the multipart body
+        # as-is; ElevenLabs needs a filename
         result = self._client.speech_to_text.convert(
-            file=audio_file,
+            file=("audio.flac", flac_bytes, "audio/flac"),
             model_id=self._model_id,
         )
 
@@ -61,3 +151,219 @@ class SpeechToText:
         )
 
         return result.text
+
+    @staticmethod
+    def _peak_frame_level(samples: np.ndarray, sample_rate: int) -> float:
+        """
+        RMS of the loudest short frame.
+
+        A whole-clip RMS is dragged down by the pauses around a short
+        utterance, while the loudest frame reflects the speech itself.
+        """
+        samples = samples.reshape(-1)
+        frame = max(1, int(SILENCE_FRAME_SECONDS * sample_rate))
+        frames = samples[: len(samples) - len(samples) % frame].reshape(-1, frame)
+        if not len(frames):
+            frames = samples.reshape(1, -1)
+        if not frames.size:
+            return 0.0
+        return float(np.sqrt(np.square(frames, dtype=np.float32).mean(axis=1).max()))
+
+    @staticmethod
+    def _to_flac(samples: np.ndarray, sample_rate: int) -> bytes:
+        """Encode 16-bit samples as FLAC."""
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format="FLAC", subtype="PCM_16")
+        return buffer.getvalue()
+
+
+class TranscriptionSession:
+    """Transcribes audio segments on a worker thread while recording continues."""
+
+    def __init__(self, stt: SpeechToText):
+        """
+        Start the session's worker thread.
+
+        Args:
+            stt: The speech-to-text client used for each segment.
+        """
+        self._stt = stt
+        self._segments: queue.Queue[bytes | None] = queue.Queue()
+        self._texts: list[str] = []
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, name="stt-session", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio_bytes: bytes) -> None:
+        """
+        Queue a WAV segment for transcription. Safe to call from any thread.
+
+        Args:
+            audio_bytes: WAV format audio bytes.
+        """
+        self._segments.put(audio_bytes)
+
+    def finish(self) -> str:
+        """
+        Wait for all queued segments and return the combined transcript.
+
+        Returns:
+            Transcribed text of every segment, in order.
+        """
+        self._segments.put(None)
+        self._thread.join()
+        if self._error:
+            raise self._error
+        return " ".join(text.strip() for text in self._texts if text.strip())
+
+    def _run(self) -> None:
+        """Transcribe segments in arrival order until the session is finished."""
+        while (audio_bytes := self._segments.get()) is not None:
+            if self._error:
+                continue
+            try:
+                self._texts.append(self._stt.transcribe(audio_bytes))
+            except Exception as e:
+                logfire.exception("Segment transcription failed")
+                self._error = e
+
+
+class RealtimeTranscriptionSession:
+    """
+    Streams audio to realtime Scribe as it is recorded.
+
+    Transcription keeps pace with speech, so on release only the audio
+    since the last pause is still waiting to be finalized. Each pause
+    commits the audio so far, which the server transcribes while the user
+    keeps talking. Only commit() commits, so audio that never ended in a
+    detected pause, such as trailing silence, is not transcribed.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        client: "ElevenLabs",
+        model_id: str,
+        sample_rate: int,
+    ):
+        """
+        Connect in the background; audio sent before the connection is up is queued.
+
+        Args:
+            loop: Event loop the websocket runs on.
+            client: ElevenLabs client providing the realtime API.
+            model_id: Realtime transcription model.
+            sample_rate: Sample rate of the int16 PCM audio sent.
+        """
+        self._loop = loop
+        # Only touched on the event loop; other threads go through call_soon_threadsafe
+        self._items: asyncio.Queue = asyncio.Queue()
+        self._result = asyncio.run_coroutine_threadsafe(
+            self._run(client, model_id, sample_rate), loop
+        )
+
+    def send_audio(self, pcm: bytes) -> None:
+        """
+        Queue raw int16 PCM to be streamed. Safe to call from the audio thread.
+
+        Args:
+            pcm: Audio samples recorded since the previous call.
+        """
+        self._loop.call_soon_threadsafe(self._items.put_nowait, pcm)
+
+    def commit(self) -> None:
+        """Commit the audio streamed so far at the end of speech. Safe to call from any thread."""
+        self._loop.call_soon_threadsafe(self._items.put_nowait, _COMMIT)
+
+    def finish(self) -> str | None:
+        """
+        Close the session and return the combined transcript.
+
+        Returns:
+            Transcribed text of every committed segment, in order, or None
+            if nothing was committed, leaving the caller to decide from the
+            whole recording.
+        """
+        self._loop.call_soon_threadsafe(self._items.put_nowait, None)
+        try:
+            return self._result.result(timeout=REALTIME_FINISH_TIMEOUT)
+        except TimeoutError:
+            self._result.cancel()
+            raise
+
+    @staticmethod
+    async def _send(connection, audio: list[bytes]) -> None:
+        """Send PCM chunks as a single audio message."""
+        await connection.send({"audio_base_64": base64.b64encode(b"".join(audio)).decode("ascii")})
+
+    @logfire.instrument("elevenlabs.stt_realtime")
+    async def _run(self, client: "ElevenLabs", model_id: str, sample_rate: int) -> str | None:
+        """Stream queued audio and commits until finish(), then collect the transcripts."""
+        realtime = _realtime()
+        connection = await client.speech_to_text.realtime.connect(
+            {
+                "model_id": model_id,
+                "audio_format": realtime.AudioFormat(f"pcm_{sample_rate}"),
+                "sample_rate": sample_rate,
+                "commit_strategy": realtime.CommitStrategy.MANUAL,
+            }
+        )
+        results: asyncio.Queue[str | Exception] = asyncio.Queue()
+        connection.on(
+            realtime.RealtimeEvents.COMMITTED_TRANSCRIPT,
+            # The API reference names the field "text", the SDK's examples "transcript"
+            lambda data: results.put_nowait(data.get("text") or data.get("transcript", "")),
+        )
+        connection.on(
+            realtime.RealtimeEvents.ERROR,
+            lambda data: results.put_nowait(RuntimeError(f"Realtime transcription failed: {data}")),
+        )
+
+        commits = 0
+        uncommitted = False
+        finished = False
+        try:
+            while not finished:
+                # Take everything queued, such as audio recorded while
+                # connecting, so consecutive chunks go out as one message
+                items = [await self._items.get()]
+                while not self._items.empty():
+                    items.append(self._items.get_nowait())
+                audio: list[bytes] = []
+                for item in items:
+                    if isinstance(item, bytes):
+                        audio.append(item)
+                        continue
+                    if item is None:
+                        # Audio since the last commit held no detected speech
+                        finished = True
+                        break
+                    # The end of a stretch of speech
+                    if audio:
+                        await self._send(connection, audio)
+                        audio = []
+                        uncommitted = True
+                    if uncommitted:
+                        await connection.commit()
+                        commits += 1
+                        uncommitted = False
+                if audio:
+                    await self._send(connection, audio)
+                    uncommitted = True
+
+            if not commits:
+                return None
+            texts = []
+            for _ in range(commits):
+                try:
+                    result = await asyncio.wait_for(results.get(), REALTIME_COMMIT_TIMEOUT)
+                except TimeoutError:
+                    logfire.warn("Realtime transcript missing, treating it as empty")
+                    continue
+                if isinstance(result, Exception):
+                    raise result
+                texts.append(result.strip())
+            logfire.info("Realtime transcription completed", segments=commits)
+            return " ".join(text for text in texts if text)
+        finally:
+            await connection.close()
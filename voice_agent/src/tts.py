@@ -1,10 +1,26 @@
 """Text-to-Speech using ElevenLabs."""
 
+import hashlib
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from pathlib import Path
 
 import logfire
-from elevenlabs import ElevenLabs
-from elevenlabs.types import VoiceSettings
+
+from .elevenlabs_client import get_elevenlabs_client
+
+# Whitespace following sentence-ending punctuation
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+
+# Synthesized phrases kept in memory
+PCM_CACHE_SIZE = 64
+# Seconds before a phrase cached on disk is synthesized again and its
+# file deleted
+PCM_CACHE_TTL = 7 * 86400
 
 
 class TextToSpeech:
@@ -16,6 +32,8 @@ class TextToSpeech:
         voice_id: str = "JBFqnCBsd6RMkjVDRZzb",
         model_id: str = "eleven_turbo_v2_5",
         speed: float = 1.2,
+        input_streaming: bool = True,
+        cache_dir: str | os.PathLike | None = "~/.cache/voice_agent/tts",
     ):
         """
         Initialize the TTS client.
@@ -25,58 +43,221 @@ class TextToSpeech:
             voice_id: Voice ID to use. Default is "George".
             model_id: Model to use. Default is turbo v2.5 for low latency.
             speed: Speech speed multiplier (0.25 to 4.0). Default is 1.2 for slightly faster speech.
+            input_streaming: Whether stream_text() sends text over ElevenLabs'
+                input-streaming websocket as it arrives, when the SDK supports
+                it, rather than requesting each sentence separately.
+            cache_dir: Directory where audio for cacheable phrases is kept across
+                runs, or None to cache it in memory only.
         """
         self._api_key = api_key or os.environ.get("ELEVENLABS_API_KEY")
         if not self._api_key:
             raise ValueError(
                 "ElevenLabs API key required. Set ELEVENLABS_API_KEY env var or pass api_key."
             )
-        self._client = ElevenLabs(api_key=self._api_key)
+        self._client = get_elevenlabs_client(self._api_key)
+        # The SDK is loaded with the client, so this import is free here
+        from elevenlabs.types import VoiceSettings
+
         self._voice_id = voice_id
         self._model_id = model_id
         self._speed = speed
+        # Validated once here rather than rebuilt for every request
+        self._request_kwargs = {
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "output_format": "pcm_24000",  # 24kHz 16-bit mono PCM
+            "voice_settings": VoiceSettings(speed=speed),
+        }
+        self._input_streaming = input_streaming and hasattr(
+            self._client.text_to_speech, "convert_realtime"
+        )
+        # sha256 key -> PCM of a short phrase, least recently used first
+        self._pcm_cache: OrderedDict[str, bytes] = OrderedDict()
+        self._pcm_lock = threading.Lock()
+        self._cache_dir = Path(cache_dir).expanduser() if cache_dir is not None else None
 
     @logfire.instrument("elevenlabs.tts")
-    def synthesize(self, text: str) -> bytes:
+    def synthesize(self, text: str, cacheable: bool = False) -> bytes:
         """
         Convert text to speech.
 
         Args:
             text: Text to speak.
+            cacheable: Whether the audio may be cached, as for stream().
 
         Returns:
-            Raw PCM audio bytes (24kHz, 16-bit mono).
+            Raw PCM audio bytes (24kHz, 16-bit mono), or b"" for blank text.
+        """
+        # join sizes the result once and copies each chunk into it once;
+        # callers that play the audio should use stream() and skip the buffer
+        return b"".join(self.stream(text, cacheable))
+
+    def stream_text(self, text_chunks: Iterable[str]) -> Iterator[bytes]:
+        """
+        Speak text while it is still being generated, one sentence at a time.
+
+        With input streaming, text is forwarded over one websocket as it
+        arrives and synthesis starts after the first few words. Otherwise
+        each sentence is sent to TTS as soon as it is complete. Either way
+        the first audio can play while the rest of the text is still arriving.
+
+        Args:
+            text_chunks: Pieces of text in order, e.g. streamed LLM output.
+
+        Yields:
+            Raw PCM audio chunks (24kHz, 16-bit mono).
+        """
+        if self._input_streaming:
+            yield from self._stream_input(text_chunks)
+            return
+
+        pending = ""
+        for chunk in text_chunks:
+            pending += chunk
+            *sentences, pending = _SENTENCE_BREAK.split(pending)
+            for sentence in sentences:
+                yield from self.stream(sentence)
+        if pending.strip():
+            yield from self.stream(pending.strip())
+
+    def _stream_input(self, text_chunks: Iterable[str]) -> Iterator[bytes]:
         """
-        if not text:
-            return b""
+        Synthesize text over the input-streaming websocket while it is still arriving.
+
+        Args:
+            text_chunks: Pieces of text in order.
 
+        Yields:
+            Raw PCM audio chunks (24kHz, 16-bit mono), as they are generated.
+        """
         logfire.info(
-            "Starting speech synthesis",
-            text_length=len(text),
+            "Starting streaming speech synthesis",
             voice_id=self._voice_id,
             model_id=self._model_id,
         )
 
-        # Generate audio - returns a generator
-        audio_generator = self._client.text_to_speech.convert(
+        audio_chunks = self._client.text_to_speech.convert_realtime(
+            text=iter(text_chunks), **self._request_kwargs
+        )
+
+        audio_size = 0
+        for chunk in audio_chunks:
+            audio_size += len(chunk)
+            yield chunk
+
+        logfire.info(
+            "Streaming speech synthesis completed",
+            audio_size_bytes=audio_size,
+        )
+
+    def stream(self, text: str, cacheable: bool = False) -> Iterator[bytes]:
+        """
+        Convert text to speech, yielding audio as it arrives.
+
+        Uses the streaming endpoint so playback can start on the first chunk
+        instead of waiting for the whole response to download.
+
+        Args:
+            text: Text to speak.
+            cacheable: Whether the text is a canned phrase, such as a
+                fallback reply, whose audio is kept and replayed the next
+                time it is spoken.
+
+        Yields:
+            Raw PCM audio chunks (24kHz, 16-bit mono). Chunk boundaries are
+            arbitrary and may split a sample. Nothing for blank text.
+        """
+        if not text.strip():
+            return
+
+        key = self._pcm_key(text) if cacheable else None
+        cached = self._cached_pcm(key) if key else None
+        if cached is not None:
+            logfire.info("Speech cache hit", text_length=len(text), audio_size_bytes=len(cached))
+            yield cached
+            return
+
+        logfire.info(
+            "Starting speech synthesis",
+            text_length=len(text),
             voice_id=self._voice_id,
-            text=text,
             model_id=self._model_id,
-            output_format="pcm_24000",  # 24kHz 16-bit mono PCM
-            voice_settings=VoiceSettings(speed=self._speed),
         )
 
-        # Collect all chunks from the generator
-        audio_chunks = []
-        for chunk in audio_generator:
-            if isinstance(chunk, bytes):
-                audio_chunks.append(chunk)
+        audio_chunks = self._client.text_to_speech.stream(text=text, **self._request_kwargs)
 
-        audio_bytes = b"".join(audio_chunks)
+        audio_size = 0
+        parts: list[bytes] = []
+        for chunk in audio_chunks:
+            if isinstance(chunk, bytes):
+                audio_size += len(chunk)
+                if key:
+                    parts.append(chunk)
+                yield chunk
 
         logfire.info(
             "Speech synthesis completed",
-            audio_size_bytes=len(audio_bytes),
+            audio_size_bytes=audio_size,
         )
+        # Only reached if the caller consumed the whole stream
+        if key and parts:
+            self._cache_pcm(key, b"".join(parts))
+
+    def _pcm_key(self, text: str) -> str:
+        """Cache key covering everything that changes the synthesized audio."""
+        return hashlib.sha256(
+            f"{self._model_id}|{self._voice_id}|{self._speed}|{text}".encode()
+        ).hexdigest()
+
+    def _cached_pcm(self, key: str) -> bytes | None:
+        """PCM for a phrase from memory, or from disk if it hasn't expired."""
+        with self._pcm_lock:
+            pcm = self._pcm_cache.get(key)
+            if pcm is not None:
+                self._pcm_cache.move_to_end(key)
+                return pcm
+        if self._cache_dir is None:
+            return None
+        path = self._cache_dir / f"{key}.pcm"
+        try:
+            if time.time() - path.stat().st_mtime > PCM_CACHE_TTL:
+                path.unlink()
+                return None
+            pcm = path.read_bytes()
+        except OSError:
+            return None
+        self._remember_pcm(key, pcm)
+        return pcm
+
+    def _cache_pcm(self, key: str, pcm: bytes) -> None:
+        """Keep a phrase's PCM in memory and write it to the disk cache."""
+        self._remember_pcm(key, pcm)
+        if self._cache_dir is None:
+            return
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write then rename, so a reader never sees a partial file
+            tmp = self._cache_dir / f"{key}.{threading.get_ident()}.tmp"
+            tmp.write_bytes(pcm)
+            os.replace(tmp, self._cache_dir / f"{key}.pcm")
+        except OSError as e:
+            logfire.warn("Failed to write speech cache", error=str(e))
+        self._prune_disk_cache()
+
+    def _prune_disk_cache(self) -> None:
+        """Delete disk cache files older than PCM_CACHE_TTL."""
+        cutoff = time.time() - PCM_CACHE_TTL
+        for path in self._cache_dir.glob("*.pcm"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError:
+                pass
 
-        return audio_bytes
+    def _remember_pcm(self, key: str, pcm: bytes) -> None:
+        """Add a phrase to the in-memory cache, evicting the oldest if full."""
+        with self._pcm_lock:
+            self._pcm_cache[key] = pcm
+            self._pcm_cache.move_to_end(key)
+            if len(self._pcm_cache) > PCM_CACHE_SIZE:
+                self._pcm_cache.popitem(last=False)